@@ -5,14 +5,19 @@ Cara menggunakan:
 1. Pastikan sudah install: pip install torch ultralytics
 2. Jalankan: python check_labels_simple.py
 
+Atau import dari kode lain:
+    from check_labels_simple import get_yolo_names
+    names = get_yolo_names("services/models/yolov5s.pt")  # {0: 'person', ...}
+
 Atau gunakan method Ultralytics (lebih mudah):
 """
 
-print("=== Cara Melihat Label Model YOLO ===\n")
+import functools
+import os
+
+PROJECT_MODEL_PATH = "services/models/yolov5s.pt"
 
-print("Method 1: Menggunakan Ultralytics (Recommended)")
-print("-" * 40)
-print("""
+METHOD_ULTRALYTICS = """
 from ultralytics import YOLO
 
 # Load model
@@ -24,11 +29,9 @@ print(model.names)
 
 # Lihat jumlah classes
 print(f"Total classes: {len(model.names)}")
-""")
+"""
 
-print("\nMethod 2: Menggunakan PyTorch langsung")
-print("-" * 40)
-print("""
+METHOD_PYTORCH = """
 import torch
 
 # Load model
@@ -37,35 +40,31 @@ model = torch.load('path/to/model.pt', map_location='cpu')
 # Cek berbagai lokasi untuk names
 if 'names' in model:
     print(model['names'])
-    
+
 if 'model' in model and hasattr(model['model'], 'names'):
     print(model['model'].names)
-    
+
 if 'train_args' in model and 'names' in model['train_args']:
     print(model['train_args']['names'])
-""")
+"""
 
-print("\nMethod 3: Untuk model YOLOv5 default (COCO dataset)")
-print("-" * 40)
-print("""
+METHOD_COCO = """
 YOLOv5 default menggunakan 80 classes COCO:
-0: person          40: wine glass      
-1: bicycle         41: cup             
-2: car             42: fork            
-3: motorcycle      43: knife           
-4: airplane        44: spoon           
-5: bus             45: bowl            
-6: train           46: banana          
-7: truck           47: apple           
-8: boat            48: sandwich        
-9: traffic light   49: orange          
-10: fire hydrant   50: broccoli        
+0: person          40: wine glass
+1: bicycle         41: cup
+2: car             42: fork
+3: motorcycle      43: knife
+4: airplane        44: spoon
+5: bus             45: bowl
+6: train           46: banana
+7: truck           47: apple
+8: boat            48: sandwich
+9: traffic light   49: orange
+10: fire hydrant   50: broccoli
 ... dan seterusnya hingga 79: toothbrush
-""")
+"""
 
-print("\nContoh penggunaan di project ini:")
-print("-" * 40)
-print("""
+PROJECT_EXAMPLE = """
 # Di services/ProductDetector.py
 import torch
 
@@ -75,16 +74,88 @@ model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path)
 # Akses labels
 labels = model.names  # atau model.model.names
 print(labels)
-""")
+"""
 
-# Coba baca label dari model yang ada di project
-import os
 
-if os.path.exists("services/models/yolov5s.pt"):
-    print("\n=== Info Model di Project Ini ===")
-    print("Model tersedia: services/models/yolov5s.pt")
-    print("Kemungkinan menggunakan COCO classes (80 classes)")
-    print("Untuk melihat detail, jalankan dengan Python yang sudah install torch & ultralytics")
-else:
-    print("\nTidak ada model .pt yang ditemukan di services/models/")
-    print("Model akan di-download otomatis saat menjalankan aplikasi")
\ No newline at end of file
+def _to_names_dict(names):
+    if isinstance(names, dict):
+        return {int(idx): str(name) for idx, name in names.items()}
+    if isinstance(names, (list, tuple)):
+        return {idx: str(name) for idx, name in enumerate(names)}
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def get_yolo_names(model_path: str) -> dict:
+    """
+    Ambil class names dari model .pt dalam bentuk {index: nama}.
+    Hasil di-cache per path, jadi panggilan berikutnya tidak membaca file lagi.
+    """
+    import torch
+
+    try:
+        # mmap: bobot model tidak disalin ke memori, hanya bagian yang dibaca
+        model = torch.load(model_path, map_location='cpu', mmap=True, weights_only=False)
+    except (TypeError, RuntimeError):
+        model = torch.load(model_path, map_location='cpu')
+
+    if not isinstance(model, dict):
+        return _to_names_dict(getattr(model, 'names', None)) or {}
+
+    # Urutan sama seperti check_model_labels.py: model.names, names, yaml, train_args
+    candidates = [getattr(model.get('model'), 'names', None), model.get('names')]
+    if 'yaml' in model:
+        yaml_data = model['yaml']
+        if isinstance(yaml_data, str):
+            import yaml
+            yaml_data = yaml.safe_load(yaml_data)
+        if isinstance(yaml_data, dict):
+            candidates.append(yaml_data.get('names'))
+    if isinstance(model.get('train_args'), dict):
+        candidates.append(model['train_args'].get('names'))
+
+    for names in candidates:
+        names_dict = _to_names_dict(names)
+        if names_dict:
+            return names_dict
+    return {}
+
+
+def main():
+    print("=== Cara Melihat Label Model YOLO ===\n")
+
+    print("Method 1: Menggunakan Ultralytics (Recommended)")
+    print("-" * 40)
+    print(METHOD_ULTRALYTICS)
+
+    print("\nMethod 2: Menggunakan PyTorch langsung")
+    print("-" * 40)
+    print(METHOD_PYTORCH)
+
+    print("\nMethod 3: Untuk model YOLOv5 default (COCO dataset)")
+    print("-" * 40)
+    print(METHOD_COCO)
+
+    print("\nContoh penggunaan di project ini:")
+    print("-" * 40)
+    print(PROJECT_EXAMPLE)
+
+    # Coba baca label dari model yang ada di project
+    if os.path.exists(PROJECT_MODEL_PATH):
+        print("\n=== Info Model di Project Ini ===")
+        print(f"Model tersedia: {PROJECT_MODEL_PATH}")
+        try:
+            names = get_yolo_names(PROJECT_MODEL_PATH)
+            print(f"Total classes: {len(names)}")
+            for idx, name in names.items():
+                print(f"{idx}: {name}")
+        except ImportError:
+            print("Kemungkinan menggunakan COCO classes (80 classes)")
+            print("Untuk melihat detail, jalankan dengan Python yang sudah install torch & ultralytics")
+    else:
+        print("\nTidak ada model .pt yang ditemukan di services/models/")
+        print("Model akan di-download otomatis saat menjalankan aplikasi")
+
+
+if __name__ == "__main__":
+    main()
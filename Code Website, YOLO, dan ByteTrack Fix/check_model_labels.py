@@ -1,57 +1,100 @@
-import torch
-import yaml
+import pickle
+import zipfile
 from pathlib import Path
 
+# torch and yaml are imported where they are used so the "no model found" path
+# does not pay for loading them
+
+class _SkeletonUnpickler(pickle.Unpickler):
+    """
+    Unpickle a checkpoint's data.pkl without touching tensor storage.
+
+    Every tensor comes back as None; dicts, names and model attributes keep their values.
+    """
+    def find_class(self, module, name):
+        if (module == 'torch._utils' and name.startswith('_rebuild_')) or \
+                (module == 'torch._tensor' and name == '_rebuild_from_type_v2'):
+            return lambda *args, **kwargs: None
+        return super().find_class(module, name)
+
+    def persistent_load(self, pid):
+        # ('storage', storage_type, key, location, numel): weights are never read
+        return None
+
+def _load_checkpoint_skeleton(model_path):
+    """
+    Read only data.pkl from a zip-format .pt file, skipping the weight blobs
+    """
+    with zipfile.ZipFile(model_path) as archive:
+        pickle_name = next(name for name in archive.namelist() if name.endswith('/data.pkl'))
+        with archive.open(pickle_name) as f:
+            return _SkeletonUnpickler(f).load()
+
+def _load_checkpoint(model_path):
+    """
+    Load a checkpoint memory-mapped so tensor storage is only paged in when touched
+    """
+    try:
+        # Names only live in the pickle, so skip the tensor data entirely
+        checkpoint = _load_checkpoint_skeleton(model_path)
+        if isinstance(checkpoint, dict):
+            return checkpoint
+    except Exception as e:
+        print(f"Fast label read failed, loading full checkpoint: {e}")
+    
+    import torch
+    
+    try:
+        # PyTorch >= 2.1: names are read without copying the weights into memory
+        return torch.load(model_path, map_location='cpu', mmap=True, weights_only=False)
+    except (TypeError, RuntimeError):
+        # Older PyTorch or legacy (non-zip) checkpoint format
+        return torch.load(model_path, map_location='cpu')
+
+def _print_names(title, names):
+    print(f"\n=== {title} ===")
+    if isinstance(names, dict):
+        for idx, name in names.items():
+            print(f"{idx}: {name}")
+    else:
+        for idx, name in enumerate(names):
+            print(f"{idx}: {name}")
+
 def check_yolo_labels(model_path):
     """
     Check labels/classes in a YOLO .pt model file
+
+    Returns True if labels were found in the checkpoint
     """
     print(f"Loading model: {model_path}")
     
     try:
         # Load the model
-        model = torch.load(model_path, map_location='cpu')
+        model = _load_checkpoint(model_path)
+        names_found = False
         
         # Method 1: Check if model has 'names' attribute
-        if 'model' in model:
-            if hasattr(model['model'], 'names'):
-                print("\n=== Labels from model.names ===")
-                names = model['model'].names
-                for idx, name in enumerate(names):
-                    print(f"{idx}: {name}")
+        if 'model' in model and hasattr(model['model'], 'names'):
+            _print_names("Labels from model.names", model['model'].names)
+            names_found = True
         
         # Method 2: Check in model dictionary directly
-        if 'names' in model:
-            print("\n=== Labels from model['names'] ===")
-            names = model['names']
-            if isinstance(names, dict):
-                for idx, name in names.items():
-                    print(f"{idx}: {name}")
-            elif isinstance(names, list):
-                for idx, name in enumerate(names):
-                    print(f"{idx}: {name}")
+        elif 'names' in model and isinstance(model['names'], (dict, list)):
+            _print_names("Labels from model['names']", model['names'])
+            names_found = True
         
         # Method 3: Check model yaml data if exists
-        if 'yaml' in model:
-            print("\n=== YAML Configuration ===")
+        elif 'yaml' in model:
+            import yaml
             yaml_data = yaml.safe_load(model['yaml'])
-            if 'names' in yaml_data:
-                print("Labels from YAML:")
-                names = yaml_data['names']
-                if isinstance(names, dict):
-                    for idx, name in names.items():
-                        print(f"{idx}: {name}")
-                elif isinstance(names, list):
-                    for idx, name in enumerate(names):
-                        print(f"{idx}: {name}")
+            if 'names' in yaml_data and isinstance(yaml_data['names'], (dict, list)):
+                _print_names("Labels from YAML", yaml_data['names'])
+                names_found = True
         
         # Method 4: For Ultralytics YOLO models
-        if 'train_args' in model:
-            if 'names' in model['train_args']:
-                print("\n=== Labels from train_args ===")
-                names = model['train_args']['names']
-                for idx, name in names.items():
-                    print(f"{idx}: {name}")
+        if not names_found and 'train_args' in model and 'names' in model['train_args']:
+            _print_names("Labels from train_args", model['train_args']['names'])
+            names_found = True
         
         # Show model info
         print("\n=== Model Info ===")
@@ -63,9 +106,12 @@ def check_yolo_labels(model_path):
                 print(f"Model YAML: {model_obj.yaml}")
             if hasattr(model_obj, 'nc'):
                 print(f"Number of classes: {model_obj.nc}")
+        
+        return names_found
                 
     except Exception as e:
         print(f"Error loading model: {e}")
+        return False
 
 # Alternative method using Ultralytics
 def check_labels_ultralytics(model_path):
@@ -105,9 +151,9 @@ if __name__ == "__main__":
             print(f"Checking: {path}")
             print('='*50)
             
-            # Try both methods
-            check_yolo_labels(path)
-            check_labels_ultralytics(path)
+            # Ultralytics loads the whole model again, so only use it as a fallback
+            if not check_yolo_labels(path):
+                check_labels_ultralytics(path)
             break
     else:
         print("No YOLO model found in services/models/")
@@ -1,22 +1,62 @@
+import contextlib
+import logging
 import cv2
+import numpy as np
 import threading
 import time
 import platform
 
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = platform.system() == "Windows"
+IS_LINUX = platform.system() == "Linux"
+# Windows: MSMF first, then DSHOW. CAP_ANY is left out because on Windows it
+# just retries MSMF and DSHOW; on Linux V4L2 is the only backend worth opening.
+if IS_WINDOWS:
+    BACKENDS = (cv2.CAP_MSMF, cv2.CAP_DSHOW)
+elif IS_LINUX:
+    BACKENDS = (cv2.CAP_V4L2,)
+else:
+    BACKENDS = (cv2.CAP_ANY,)
+FOURCC_MJPG = cv2.VideoWriter_fourcc(*'MJPG')
+FOURCC_YUY2 = cv2.VideoWriter_fourcc(*'YUY2')
+# OpenCL lets cv2 functions called on a UMat run on the iGPU instead of NumPy
+HAVE_OPENCL = cv2.ocl.haveOpenCL()
+
 
 class Camera:
-    def __init__(self, camera_id=1):
+    def __init__(self, camera_id=1, manager=None):
         self.camera_id = camera_id
+        # With a CameraManager the device handle is borrowed from it instead of
+        # opening a second VideoCapture on a device that only allows one
+        self.manager = manager
+        self._last_shared_seq = None
         self.cap = None
         self.is_running = False
-        self.frame = None
         self.lock = threading.Lock()
         self.frame_width = 640
         self.frame_height = 480
-        self.last_frame_time = 0
-        self.frame_timeout = 3.0
+
+        # Triple buffer: the capture thread writes into the write slot, then
+        # swaps it with the ready slot; read() swaps ready with the read slot.
+        self._buffers = None
+        self._write_idx = 0
+        self._ready_idx = 1
+        self._read_idx = 2
+        self._has_new_frame = False
+        self._has_frame = False
+        self._alloc_buffers()
+        self.last_frame_time_ns = 0
+        self._frame_timeout_ns = 3_000_000_000
         self.max_retries = 3
         self.retry_count = 0
+        self.max_grabs = 4
+        self.live_grab_time = 0.003
+        self.read_timeout = 0.5
+        self._capture_thread = None
+        self._frame_event = threading.Event()
+        # Device properties only change when the capture is reopened
+        self._info_cache = None
 
     def start(self):
         if self.is_running:
@@ -26,7 +66,10 @@ class Camera:
             try:
                 if self._try_open_camera():
                     self.is_running = True
-                    self.last_frame_time = time.time()
+                    self.last_frame_time_ns = time.monotonic_ns()
+                    self._frame_event.clear()
+                    self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+                    self._capture_thread.start()
                     return True
                 else:
                     print(f"Camera attempt {attempt + 1} failed, retrying...")
@@ -39,102 +82,221 @@ class Camera:
         return False
 
     def _try_open_camera(self):
-        if platform.system() == "Windows":
-            # Try different backends for Windows - MSMF first, then CAP_ANY (no backend), then DSHOW
-            backends = [cv2.CAP_MSMF, cv2.CAP_ANY, cv2.CAP_DSHOW]
-        else:
-            backends = [cv2.CAP_V4L2, cv2.CAP_ANY]
+        if self.manager is not None:
+            return self._attach_manager_camera()
 
-        for backend in backends:
+        for backend in BACKENDS:
             try:
-                
-                # For CAP_ANY, don't specify backend parameter
-                if backend == cv2.CAP_ANY:
-                    self.cap = cv2.VideoCapture(self.camera_id)
-                else:
-                    self.cap = cv2.VideoCapture(self.camera_id, backend)
-                
-                if not self.cap.isOpened():
-                    if self.cap:
-                        self.cap.release()
-                    continue
-
-                # Set camera properties
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                self.cap.set(cv2.CAP_PROP_FPS, 30)
-                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                
-                # Additional Windows-specific settings for better compatibility
-                if platform.system() == "Windows":
-                    try:
-                        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
-                    except:
-                        pass
-
-                self.frame_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                self.frame_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-                # Test read to ensure camera is working
-                ret, test_frame = self.cap.read()
-                if ret and test_frame is not None:
-                    # Test one more frame to ensure stability
-                    ret, _ = self.cap.read()
-                    if ret:
-                        return True
-                    else:
-                        self.cap.release()
-                else:
-                    self.cap.release()
-                    continue
+                with contextlib.ExitStack() as stack:
+                    cap = cv2.VideoCapture(self.camera_id, backend)
+                    # Released on every early exit; pop_all() keeps it once it works
+                    stack.callback(cap.release)
+                    if not cap.isOpened():
+                        continue
+                    self.cap = cap
 
-            except Exception as e:
-                if self.cap:
-                    self.cap.release()
-                continue
+                    # Set camera properties
+                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                    cap.set(cv2.CAP_PROP_FPS, 30)
+                    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+                    self._select_pixel_format()
+
+                    self.frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+                    self.frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                    self._alloc_buffers()
+
+                    # Test read twice to ensure the camera is working and stable
+                    ret, test_frame = cap.read()
+                    if not ret or test_frame is None:
+                        logger.debug("backend %s: camera %s returned no test frame", backend, self.camera_id)
+                        continue
+                    ret, _ = cap.read()
+                    if not ret:
+                        logger.debug("backend %s: camera %s failed the second read", backend, self.camera_id)
+                        continue
+
+                    self._cache_info()
+                    stack.pop_all()
+                    return True
+            except (cv2.error, OSError) as e:
+                logger.debug("backend %s failed: %s", backend, e)
+            finally:
+                if self.cap is not None and not self.cap.isOpened():
+                    self.cap = None
 
         return False
 
+    def _attach_manager_camera(self):
+        manager = self.manager
+        cap = manager.current_camera
+        if cap is None or not cap.isOpened() or manager.current_camera_id != self.camera_id:
+            if not manager.initialize_camera(self.camera_id):
+                return False
+            cap = manager.current_camera
+
+        self._adopt_capture(cap)
+        return True
+
+    def _adopt_capture(self, cap):
+        self.cap = cap
+        self.frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._alloc_buffers()
+        self._cache_info()
+
+    def _follow_manager_camera(self):
+        # Adopt whatever handle the manager has open now; the manager alone reopens its
+        # device, a borrower never re-initializes it from the capture thread
+        cap = self.manager.current_camera
+        if cap is None or not cap.isOpened():
+            return False
+        if cap is not self.cap:
+            self.camera_id = self.manager.current_camera_id
+            self._adopt_capture(cap)
+        # A switch or scan can take longer than the frame timeout, start counting afresh
+        self.last_frame_time_ns = time.monotonic_ns()
+        return True
+
+    def _cache_info(self):
+        self._info_cache = {
+            'width': self.frame_width,
+            'height': self.frame_height,
+            'fps': int(self.cap.get(cv2.CAP_PROP_FPS)),
+            'backend': self.cap.getBackendName(),
+            'camera_id': self.camera_id
+        }
+
+    def _select_pixel_format(self):
+        # MJPG keeps USB bandwidth low; fall back to raw YUY2 if the device refuses it
+        for fourcc in (FOURCC_MJPG, FOURCC_YUY2):
+            self.cap.set(cv2.CAP_PROP_FOURCC, fourcc)
+            if int(self.cap.get(cv2.CAP_PROP_FOURCC)) == fourcc:
+                print(f"Camera {self.camera_id} pixel format: {self._fourcc_name(fourcc)}")
+                return fourcc
+
+        actual = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        print(f"Camera {self.camera_id} pixel format: {self._fourcc_name(actual)} (MJPG/YUY2 not accepted)")
+        return actual
+
+    @staticmethod
+    def _fourcc_name(fourcc):
+        if fourcc <= 0:
+            return "unknown"
+        return "".join(chr((fourcc >> (8 * k)) & 0xFF) for k in range(4))
+
     def stop(self):
         self.is_running = False
+        self._frame_event.set()
+        if self._capture_thread and self._capture_thread is not threading.current_thread():
+            self._capture_thread.join(timeout=1.0)
+        self._capture_thread = None
+        self._info_cache = None
         if self.cap and self.cap.isOpened():
-            self.cap.release()
+            # A borrowed handle stays open; the manager owns its lifetime
+            if self.manager is None:
+                self.cap.release()
             self.cap = None
         return True
 
     def read(self):
-        if not self.is_running or not self.cap or not self.cap.isOpened():
+        if not self.is_running:
             return False, None
 
+        self._frame_event.wait(self.read_timeout)
+        with self.lock:
+            if not self.is_running or not self._has_new_frame:
+                return False, None
+            self._ready_idx, self._read_idx = self._read_idx, self._ready_idx
+            self._has_new_frame = False
+            self._frame_event.clear()
+            return True, self._buffers[self._read_idx]
+
+    def read_umat(self):
+        # Same as read(), but hands back a cv2.UMat when OpenCL is available so
+        # resize/cvtColor downstream stay on the GPU; plain ndarray otherwise
+        ret, frame = self.read()
+        if not ret or not HAVE_OPENCL:
+            return ret, frame
+        return True, cv2.UMat(frame)
+
+    def _capture_loop(self):
+        while self.is_running:
+            if not self._capture_frame():
+                time.sleep(0.01)
+
+    def _capture_frame(self):
+        if self.manager is not None and self.cap is not self.manager.current_camera:
+            # Follow camera switches made through the manager
+            if not self._follow_manager_camera():
+                return False
+
+        if not self.cap or not self.cap.isOpened():
+            return False
+
         try:
-            current_time = time.time()
+            now_ns = time.monotonic_ns()
             
-            if current_time - self.last_frame_time > self.frame_timeout:
+            if now_ns - self.last_frame_time_ns > self._frame_timeout_ns:
                 print("Camera timeout, attempting reconnect...")
                 if not self._reconnect():
-                    return False, None
+                    return False
+
+            write_idx = self._write_idx
+            if self.manager is not None:
+                # The manager's reader thread owns grab(); copy its newest frame without
+                # consuming it, so the manager's own read_frame callers still get every frame
+                seq, frame = self.manager.peek_frame(self._buffers[write_idx])
+                if frame is None or seq == self._last_shared_seq:
+                    return False
+                self._last_shared_seq = seq
+                ret = True
+            else:
+                # Drain frames queued by the driver; a grab that blocks longer than
+                # live_grab_time means we have reached the live edge
+                ret = False
+                for _ in range(self.max_grabs):
+                    grab_start = time.perf_counter()
+                    if not self.cap.grab():
+                        break
+                    ret = True
+                    if time.perf_counter() - grab_start > self.live_grab_time:
+                        break
 
-            ret, frame = self.cap.read()
+                frame = None
+                if ret:
+                    ret, frame = self.cap.retrieve(self._buffers[write_idx])
             
             if ret and frame is not None:
-                self.last_frame_time = current_time
+                self.last_frame_time_ns = now_ns
                 self.retry_count = 0
+                # OpenCV reallocates when the frame size differs from the slot
+                self._buffers[write_idx] = frame
                 with self.lock:
-                    self.frame = frame.copy()
-                return True, frame
+                    self._write_idx, self._ready_idx = self._ready_idx, write_idx
+                    self._has_new_frame = True
+                    self._has_frame = True
+                    # Set under the lock so read() can never clear the event
+                    # before a late set() re-arms it with no frame behind it
+                    self._frame_event.set()
+                return True
             else:
                 self.retry_count += 1
                 if self.retry_count > 5:
                     print("Multiple read failures, attempting reconnect...")
                     self._reconnect()
-                return False, None
+                return False
                 
         except Exception as e:
             print(f"Camera read error: {e}")
-            return False, None
+            return False
 
     def _reconnect(self):
+        self._info_cache = None
         try:
+            if self.manager is not None:
+                return self._follow_manager_camera()
             if self.cap:
                 self.cap.release()
             time.sleep(0.1)
@@ -143,14 +305,25 @@ class Camera:
             print(f"Reconnect error: {e}")
             return False
 
+    def _alloc_buffers(self):
+        shape = (self.frame_height, self.frame_width, 3)
+        if self._buffers is not None and self._buffers[0].shape == shape:
+            return
+        with self.lock:
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(3)]
+            self._has_new_frame = False
+            self._has_frame = False
+
     def get_dimensions(self):
         return (self.frame_width, self.frame_height)
     
     def get_latest_frame(self):
         with self.lock:
-            if self.frame is not None:
-                return self.frame.copy()
-            return None
+            if not self._has_frame:
+                return None
+            # Peek without taking ownership of the ready slot so read() still sees it
+            latest_idx = self._ready_idx if self._has_new_frame else self._read_idx
+            return self._buffers[latest_idx].copy()
     
     def is_available(self):
         return self.is_running and self.cap and self.cap.isOpened()
@@ -158,15 +331,6 @@ class Camera:
     def get_camera_info(self):
         if not self.is_available():
             return None
-        
-        try:
-            return {
-                'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-                'fps': int(self.cap.get(cv2.CAP_PROP_FPS)),
-                'backend': self.cap.getBackendName() if hasattr(self.cap, 'getBackendName') else 'unknown',
-                'camera_id': self.camera_id
-            }
-        except Exception as e:
-            print(f"Error getting camera info: {e}")
-            return None
\ No newline at end of file
+        if self._info_cache is None:
+            self._cache_info()
+        return dict(self._info_cache)
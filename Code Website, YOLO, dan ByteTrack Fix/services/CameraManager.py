@@ -1,7 +1,29 @@
+import collections
 import cv2
+import glob
+import logging
+import os
+import re
 import time
 import threading
-from typing import List, Dict, Optional
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = platform.system() == "Windows"
+IS_LINUX = platform.system() == "Linux"
+# DirectShow on Windows for better compatibility, V4L2 directly on Linux
+if IS_WINDOWS:
+    CAMERA_BACKENDS = (cv2.CAP_DSHOW,)
+elif IS_LINUX:
+    CAMERA_BACKENDS = (cv2.CAP_V4L2,)
+else:
+    CAMERA_BACKENDS = (cv2.CAP_ANY,)
+FOURCC_MJPG = cv2.VideoWriter_fourcc(*'MJPG')
+# Largest first so the probe can stop at the first size that is not an upgrade
+PROBE_RESOLUTIONS = ((1920, 1080), (1280, 720), (960, 540), (640, 480), (320, 240))
 
 
 class CameraManager:
@@ -14,9 +36,80 @@ class CameraManager:
         self.current_camera = None
         self.current_camera_id = 1
         self.available_cameras = []
-        self.lock = threading.Lock()
+        self.lock = threading.RLock()
         self.is_switching = False
+        # get_current_camera_info result, valid while _info_cache_camera is current
+        self._info_cache = None
+        self._info_cache_camera = None
+        # Background reader: always holds only the newest frame, older ones are dropped
+        self._latest = collections.deque(maxlen=1)
+        self._stop = threading.Event()
+        self._reader_thread = None
+        # Shared with the running reader: 'exited' once it is done, 'orphaned' if it must release its own handle
+        self._reader_state = {'exited': True, 'orphaned': False}
+        self._reader_state_lock = threading.Lock()
+        self._reader_error = None
+        # Frames nobody references any more; the reader decodes into these instead of allocating
+        self._free_frames = collections.deque(maxlen=2)
+        self._frame_lock = threading.Lock()
+        # Notified whenever the reader publishes a frame or stops with an error
+        self._frame_ready = threading.Condition(self._frame_lock)
+        # Bumped for every frame published to _latest, lets peek_frame callers skip repeats
+        self._frame_seq = 0
+        # (width, height) applied to every camera that gets opened, None keeps the driver default
+        self.requested_resolution: Optional[Tuple[int, int]] = None
+        # The reader grab()s every frame but only decodes every k-th one
+        self._decode_every = 1
+        # message key -> monotonic time it was last logged, see _throttle
+        self._last_log = {}
+        # camera_id -> (max_width, max_height) from _probe_max_resolution, cleared on rescan
+        self._max_resolution_cache: Dict[int, Tuple[int, int]] = {}
+        
+    
+    def set_requested_resolution(self, resolution):
+        """
+        Set the capture size requested when a camera is opened.
+        
+        Args:
+            resolution: 'WIDTHxHEIGHT' string or (width, height) pair
+        """
+        try:
+            if isinstance(resolution, str):
+                width, height = map(int, resolution.lower().split('x'))
+                self.requested_resolution = (width, height)
+            elif isinstance(resolution, (list, tuple)) and len(resolution) == 2:
+                self.requested_resolution = (int(resolution[0]), int(resolution[1]))
+        except ValueError:
+            print(f"⚠️ Ignoring invalid camera resolution: {resolution}")
+    
+    def set_decode_every(self, k: int):
+        """
+        Decode only every k-th camera frame; the others are grabbed and dropped without decoding.
         
+        Args:
+            k: 1 decodes every frame, 2 every other frame, and so on
+        """
+        self._decode_every = max(1, int(k))
+    
+    def _configure_capture(self, cap, camera_id: int):
+        """
+        Ask for MJPG at the requested size so USB cameras are not limited by raw YUY2 bandwidth.
+        
+        Args:
+            cap: Freshly opened VideoCapture
+            camera_id: Index of the camera (for logging)
+        """
+        cap.set(cv2.CAP_PROP_FOURCC, FOURCC_MJPG)
+        if self.requested_resolution:
+            width, height = self.requested_resolution
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        fourcc = self._decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        print(f"📹 Camera {camera_id} negotiated {fourcc} {width}x{height}")
     
     def detect_available_cameras(self, max_cameras: int = 5) -> List[Dict]:
         """
@@ -29,6 +122,8 @@ class CameraManager:
             List of camera info dictionaries
         """
         available_cameras = []
+        # Indices may point at different devices after a replug, probe them again
+        self._max_resolution_cache.clear()
         
         # Store current camera state to restore later
         current_id_stored = self.current_camera_id
@@ -37,119 +132,32 @@ class CameraManager:
         print(f"🔍 Starting camera detection scan (max {max_cameras} cameras)")
         
         # FULLY release current camera for scanning
+        reader_stopped = self._stop_reader()
         if self.current_camera:
             try:
                 print(f"🔄 Releasing current camera {current_id_stored} for scanning")
-                self.current_camera.release()
-                time.sleep(2.0)  # Even longer wait to ensure camera is fully released
+                self._release_capture(self.current_camera, reader_stopped)
             except Exception as release_error:
                 print(f"❌ Error releasing camera for scanning: {release_error}")
             finally:
                 self.current_camera = None
         
         # Suppress OpenCV errors temporarily
-        import logging
         cv2_logger = logging.getLogger('cv2')
         original_level = cv2_logger.level
         cv2_logger.setLevel(logging.CRITICAL)
         
         try:
-            for i in range(max_cameras):
-                print(f"🔍 Testing camera index {i}...")
-                cap = None
-                cap = None
-                
-                try:
-                    # Use DirectShow backend on Windows for better compatibility
-                    import platform
-                    if platform.system() == "Windows":
-                        cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-                    else:
-                        cap = cv2.VideoCapture(i)
-                    
-                    # Set a timeout for camera operations
-                    timeout_start = time.time()
-                    timeout_duration = 5.0  # 5 seconds timeout per camera
-                    
-                    if cap.isOpened():
-                        print(f"  📹 Camera {i} opened successfully")
-                        
-                        # Quick frame test first to avoid hanging
-                        print(f"  🔍 Testing frame capture for camera {i}...")
-                        ret, frame = cap.read()
-                        
-                        if ret and frame is not None and len(frame.shape) >= 2:
-                            actual_height, actual_width = frame.shape[:2]
-                            print(f"  ✅ Camera {i} basic test passed: {actual_width}x{actual_height}")
-                            
-                            # Test multiple resolutions to determine camera's actual capability
-                            test_resolutions = [(1920, 1080), (1280, 720), (960, 540), (640, 480), (320, 240)]
-                            max_supported_width, max_supported_height = actual_width, actual_height
-                            
-                            for test_w, test_h in test_resolutions:
-                                if time.time() - timeout_start > timeout_duration:
-                                    print(f"  ⏰ Timeout reached for camera {i}")
-                                    break
-                                
-                                try:
-                                    # Set the test resolution
-                                    cap.set(cv2.CAP_PROP_FRAME_WIDTH, test_w)
-                                    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, test_h)
-                                    time.sleep(0.15)  # Longer pause for setting to take effect
-                                    
-                                    # Read a frame to see actual resolution
-                                    ret, test_frame = cap.read()
-                                    if ret and test_frame is not None and len(test_frame.shape) >= 2:
-                                        test_height, test_width = test_frame.shape[:2]
-                                        # Only log significant resolution changes to reduce console spam
-                                        if test_width >= test_w * 0.9 and test_height >= test_h * 0.9:
-                                            if test_width * test_height > max_supported_width * max_supported_height:
-                                                max_supported_width, max_supported_height = test_width, test_height
-                                                # Only print when we find a new higher resolution
-                                                print(f"  ✅ Camera {i} supports {max_supported_width}x{max_supported_height}")
-                                        
-                                except Exception as res_error:
-                                    print(f"  ⚠️ Resolution test {test_w}x{test_h} failed for camera {i}: {res_error}")
-                                    continue
-                            
-                            # Use the highest supported resolution found
-                            actual_width, actual_height = max_supported_width, max_supported_height
-                            
-                            # Get other properties safely
-                            try:
-                                fps = int(cap.get(cv2.CAP_PROP_FPS))
-                                backend = cap.getBackendName()
-                            except Exception:
-                                fps = 30
-                                backend = "Unknown"
-                            
-                            camera_info = {
-                                'id': i,
-                                'name': f'Camera {i} ({backend})',
-                                'resolution': f'{actual_width}x{actual_height}',
-                                'fps': fps if fps > 0 else 30,
-                                'isActive': i == current_id_stored,
-                                'backend': backend
-                            }
-                            
-                            print(f"✅ Successfully detected Camera {i}: {actual_width}x{actual_height} @ {fps}fps ({backend})")
-                            available_cameras.append(camera_info)
-                        else:
-                            print(f"❌ Camera {i}: Cannot read frames or invalid frame")
-                    else:
-                        print(f"❌ Camera {i}: Cannot open")
-                
-                except Exception as e:
-                    print(f"❌ Error testing camera {i}: {str(e)}")
-                    # Continue to next camera instead of failing completely
-                
-                finally:
-                    if cap:
-                        try:
-                            cap.release()
-                            time.sleep(0.3)  # Delay between camera tests for stability
-                        except Exception as release_error:
-                            print(f"⚠️ Error releasing camera {i}: {release_error}")
+            device_ids = self._enumerate_device_ids(max_cameras)
+            if device_ids is None:
+                device_ids = list(range(max_cameras))
+            print(f"🔍 Probing camera indices: {device_ids}")
+            
+            if device_ids:
+                # Each index opens its own device handle and the driver calls release the GIL
+                with ThreadPoolExecutor(max_workers=len(device_ids)) as executor:
+                    results = list(executor.map(lambda i: self._probe_camera(i, current_id_stored), device_ids))
+                available_cameras = [camera_info for camera_info in results if camera_info is not None]
             
         except Exception as e:
             print(f"❌ Error during camera detection: {e}")
@@ -170,16 +178,209 @@ class CameraManager:
         self.available_cameras = available_cameras
         return available_cameras
     
+    def _enumerate_device_ids(self, max_cameras: int) -> Optional[List[int]]:
+        """
+        Ask the OS which video devices are attached so dead indices are never opened.
+        
+        Args:
+            max_cameras: Only indices below this value are returned
+            
+        Returns:
+            Sorted list of camera indices, or None if enumeration is not available
+        """
+        try:
+            if IS_WINDOWS:
+                from pygrabber.dshow_graph import FilterGraph
+                device_count = len(FilterGraph().get_input_devices())
+                return list(range(min(device_count, max_cameras)))
+            
+            if IS_LINUX and os.path.isdir('/dev'):
+                device_ids = set()
+                for path in glob.glob('/dev/video*'):
+                    match = re.fullmatch(r'/dev/video(\d+)', path)
+                    if match and int(match.group(1)) < max_cameras:
+                        device_ids.add(int(match.group(1)))
+                return sorted(device_ids)
+        except ImportError:
+            print("⚠️ pygrabber not installed - probing every camera index")
+        except Exception as e:
+            print(f"⚠️ Camera enumeration failed, probing every index: {e}")
+        
+        return None
+    
+    def _probe_camera(self, i: int, current_id_stored: Optional[int]) -> Optional[Dict]:
+        """
+        Open a single camera index, read one test frame and describe it.
+        
+        Args:
+            i: Camera index to probe
+            current_id_stored: ID of the camera that was active before scanning
+            
+        Returns:
+            Camera info dictionary, or None if the camera cannot be used
+        """
+        print(f"🔍 Testing camera index {i}...")
+        cap = None
+        camera_info = None
+        
+        try:
+            # Only the camera released for scanning can still be busy
+            cap = self._open_with_retry(i, max_wait_ms=1500 if i == current_id_stored else 0)
+            
+            if cap is not None:
+                print(f"  📹 Camera {i} opened successfully")
+                
+                # Single frame test; higher resolutions are negotiated on selection
+                print(f"  🔍 Testing frame capture for camera {i}...")
+                ret, frame = cap.read()
+                
+                if ret and frame is not None:
+                    actual_height, actual_width = frame.shape[:2]
+                    print(f"  ✅ Camera {i} basic test passed: {actual_width}x{actual_height}")
+                    
+                    # Get other properties safely
+                    try:
+                        fps = int(cap.get(cv2.CAP_PROP_FPS))
+                        backend = cap.getBackendName()
+                        fourcc = self._decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC))
+                    except Exception:
+                        fps = 30
+                        backend = "Unknown"
+                        fourcc = "Unknown"
+                    
+                    camera_info = {
+                        'id': i,
+                        'name': f'Camera {i} ({backend})',
+                        'resolution': f'{actual_width}x{actual_height}',
+                        'fps': fps if fps > 0 else 30,
+                        'isActive': i == current_id_stored,
+                        'backend': backend,
+                        'fourcc': fourcc
+                    }
+                    
+                    print(f"✅ Successfully detected Camera {i}: {actual_width}x{actual_height} @ {fps}fps ({backend})")
+                else:
+                    print(f"❌ Camera {i}: Cannot read frames or invalid frame")
+            else:
+                print(f"❌ Camera {i}: Cannot open")
+        
+        except Exception as e:
+            print(f"❌ Error testing camera {i}: {str(e)}")
+        
+        finally:
+            if cap:
+                try:
+                    cap.release()
+                except Exception as release_error:
+                    print(f"⚠️ Error releasing camera {i}: {release_error}")
+        
+        return camera_info
+    
+    def _open_with_retry(self, camera_id: int, backends=CAMERA_BACKENDS, max_wait_ms: int = 1500):
+        """
+        Open a camera, retrying with backoff only while the device is still busy.
+        
+        Windows MSMF/DirectShow may hold the handle for a moment after release();
+        V4L2 releases synchronously, so on Linux the first attempt normally succeeds.
+        
+        Args:
+            camera_id: Index of the camera to open
+            backends: OpenCV capture backends to try in order
+            max_wait_ms: Give up once this much time has been spent retrying
+            
+        Returns:
+            Opened VideoCapture, or None if the camera could not be opened
+        """
+        deadline = time.monotonic() + max_wait_ms / 1000.0
+        delay = 0.05
+        
+        while True:
+            for backend in backends:
+                cap = cv2.VideoCapture(camera_id, backend)
+                if cap.isOpened():
+                    return cap
+                cap.release()
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.4)
+    
+    @staticmethod
+    def _decode_fourcc(value) -> str:
+        code = int(value)
+        if code <= 0:
+            return "Unknown"
+        return "".join(chr((code >> (8 * k)) & 0xFF) for k in range(4))
+    
+    def _probe_max_resolution(self, cap, camera_id: int, width: int, height: int):
+        """
+        Find the highest resolution a camera delivers, then restore its original size.
+        
+        The result is cached per camera_id, so only the first switch to a camera pays for the probe.
+        
+        Args:
+            cap: Opened VideoCapture to probe
+            camera_id: Index of the camera being probed (cache key and logging)
+            width: Current frame width
+            height: Current frame height
+            
+        Returns:
+            Tuple of (max_width, max_height)
+        """
+        cached = self._max_resolution_cache.get(camera_id)
+        if cached is not None:
+            return cached
+        
+        max_supported_width, max_supported_height = width, height
+        timeout_start = time.time()
+        timeout_duration = 5.0  # 5 seconds timeout for the whole probe
+        
+        for test_w, test_h in PROBE_RESOLUTIONS:
+            if time.time() - timeout_start > timeout_duration:
+                print(f"  ⏰ Resolution probe timeout reached for camera {camera_id}")
+                break
+            
+            # Nothing below the current best can raise it
+            if test_w * test_h <= max_supported_width * max_supported_height:
+                break
+            
+            try:
+                cap.set(cv2.CAP_PROP_FRAME_WIDTH, test_w)
+                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, test_h)
+                time.sleep(0.15)  # Pause for setting to take effect
+                
+                ret, test_frame = cap.read()
+                if ret and test_frame is not None:
+                    test_height, test_width = test_frame.shape[:2]
+                    if test_width >= test_w * 0.9 and test_height >= test_h * 0.9:
+                        if test_width * test_height > max_supported_width * max_supported_height:
+                            max_supported_width, max_supported_height = test_width, test_height
+                            print(f"  ✅ Camera {camera_id} supports {max_supported_width}x{max_supported_height}")
+            except Exception as res_error:
+                logger.debug("Resolution test %dx%d failed for camera %d: %s", test_w, test_h, camera_id, res_error)
+        
+        # Keep streaming at the resolution the camera opened with
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self._max_resolution_cache[camera_id] = (max_supported_width, max_supported_height)
+        return max_supported_width, max_supported_height
+    
     def switch_camera(self, new_camera_id: int) -> Dict:
         """
         Switch to a different camera with safe management.
         
+        The lock only guards the switch state; releasing and opening devices
+        happens outside it so status requests are not blocked during a switch.
+        
         Args:
             new_camera_id: Index of the camera to switch to
             
         Returns:
             Dictionary with success status and details
         """
+        # Phase 1: claim the switch and detach the old camera
         with self.lock:
             if self.is_switching:
                 return {
@@ -207,107 +408,91 @@ class CameraManager:
             print(f"🔄 Switching camera from {self.current_camera_id} to {new_camera_id}")
             self.is_switching = True
             old_camera_id = self.current_camera_id
+            old_cap = self.current_camera
+            self.current_camera = None
+        
+        # Phase 2: slow device work without holding the lock
+        reader_stopped = self._stop_reader()
+        new_cap = None
+        try:
+            # COMPLETELY release old camera first to avoid conflicts
+            if old_cap:
+                try:
+                    print(f"🔄 Releasing old camera {old_camera_id}")
+                    self._release_capture(old_cap, reader_stopped)
+                except Exception as release_error:
+                    print(f"❌ Error releasing old camera: {release_error}")
             
-            try:
-                # COMPLETELY release old camera first to avoid conflicts
-                if self.current_camera:
-                    try:
-                        print(f"🔄 Releasing old camera {old_camera_id}")
-                        self.current_camera.release()
-                        time.sleep(1.5)  # Wait longer for camera to be fully released
-                    except Exception as release_error:
-                        print(f"❌ Error releasing old camera: {release_error}")
-                    finally:
-                        self.current_camera = None
-                
-                # Now try to initialize new camera with platform-specific backend
-                import platform
-                if platform.system() == "Windows":
-                    new_cap = cv2.VideoCapture(new_camera_id, cv2.CAP_DSHOW)
-                    print(f"🔄 Using DirectShow backend for camera switch to {new_camera_id}")
-                else:
-                    new_cap = cv2.VideoCapture(new_camera_id)
-                
-                if not new_cap.isOpened():
-                    new_cap.release()
-                    print(f"❌ Camera {new_camera_id} cannot be opened")
-                    
-                    # Try to restore old camera
-                    if old_camera_id is not None:
-                        restored_cap = cv2.VideoCapture(old_camera_id)
-                        if restored_cap.isOpened():
-                            self.current_camera = restored_cap
-                        else:
-                            restored_cap.release()
-                            print(f"❌ Failed to restore Camera {old_camera_id}")
-                    
-                    self.is_switching = False
-                    return {
-                        'success': False,
-                        'error': f'Camera {new_camera_id} cannot be opened',
-                        'camera_id': self.current_camera_id
-                    }
+            # Now try to initialize new camera with platform-specific backend
+            new_cap = self._open_with_retry(new_camera_id)
+            if new_cap is None:
+                print(f"❌ Camera {new_camera_id} cannot be opened")
+                error = f'Camera {new_camera_id} cannot be opened'
+            else:
+                self._configure_capture(new_cap, new_camera_id)
                 
                 # Test if camera can actually read frames
                 ret, frame = new_cap.read()
                 if not ret or frame is None:
                     new_cap.release()
+                    new_cap = None
                     print(f"❌ Camera {new_camera_id} cannot read frames")
-                    
-                    # Try to restore old camera
-                    if old_camera_id is not None:
-                        restored_cap = cv2.VideoCapture(old_camera_id)
-                        if restored_cap.isOpened():
-                            self.current_camera = restored_cap
-                        else:
-                            restored_cap.release()
-                            print(f"❌ Failed to restore Camera {old_camera_id}")
-                    
-                    self.is_switching = False
-                    return {
-                        'success': False,
-                        'error': f'Camera {new_camera_id} cannot read frames',
-                        'camera_id': self.current_camera_id
-                    }
-                
-                # Get new camera properties
-                width = int(new_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(new_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                
-                # Success! Switch to new camera
-                self.current_camera = new_cap
-                self.current_camera_id = new_camera_id
-                
-                self.is_switching = False
-                
-                return {
-                    'success': True,
-                    'camera_id': new_camera_id,
-                    'resolution': f'{width}x{height}',
-                    'previous_camera': old_camera_id
-                }
-                
-            except Exception as e:
-                print(f"❌ Error during camera switch: {e}")
-                
-                # Try to restore old camera if switch failed
-                if self.current_camera is None and old_camera_id is not None:
-                    try:
-                        restored_cap = cv2.VideoCapture(old_camera_id)
-                        if restored_cap.isOpened():
-                            self.current_camera = restored_cap
-                        else:
-                            restored_cap.release()
-                            print(f"❌ Failed to restore Camera {old_camera_id}")
-                    except Exception as restore_error:
-                        print(f"❌ Error restoring camera: {restore_error}")
-                
+                    error = f'Camera {new_camera_id} cannot read frames'
+        except Exception as e:
+            print(f"❌ Error during camera switch: {e}")
+            if new_cap is not None:
+                new_cap.release()
+                new_cap = None
+            error = f'Camera switch failed: {str(e)}'
+        
+        if new_cap is None:
+            # Try to restore old camera
+            restored_cap = None
+            if old_camera_id is not None:
+                try:
+                    restored_cap = self._open_with_retry(old_camera_id)
+                    if restored_cap is None:
+                        print(f"❌ Failed to restore Camera {old_camera_id}")
+                except Exception as restore_error:
+                    print(f"❌ Error restoring camera: {restore_error}")
+            
+            with self.lock:
+                self.current_camera = restored_cap
                 self.is_switching = False
+                if restored_cap is not None:
+                    self._start_reader()
                 return {
                     'success': False,
-                    'error': f'Camera switch failed: {str(e)}',
+                    'error': error,
                     'camera_id': self.current_camera_id
                 }
+        
+        # Get new camera properties
+        width = int(new_cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(new_cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        try:
+            max_width, max_height = self._probe_max_resolution(new_cap, new_camera_id, width, height)
+        except Exception as probe_error:
+            print(f"⚠️ Resolution probe failed for camera {new_camera_id}: {probe_error}")
+            max_width, max_height = width, height
+        for camera_info in self.available_cameras:
+            if camera_info['id'] == new_camera_id:
+                camera_info['resolution'] = f'{max_width}x{max_height}'
+        
+        # Phase 3: success! Commit the new camera
+        with self.lock:
+            self.current_camera = new_cap
+            self.current_camera_id = new_camera_id
+            self.is_switching = False
+            self._start_reader()
+        
+        return {
+            'success': True,
+            'camera_id': new_camera_id,
+            'resolution': f'{width}x{height}',
+            'max_resolution': f'{max_width}x{max_height}',
+            'previous_camera': old_camera_id
+        }
     
     def get_current_camera_info(self) -> Dict:
         """
@@ -316,7 +501,20 @@ class CameraManager:
         Returns:
             Dictionary with current camera details
         """
-        if not self.current_camera or not self.current_camera.isOpened():
+        with self.lock:
+            camera = self.current_camera
+            camera_id = self.current_camera_id
+            is_switching = self.is_switching
+        
+        if is_switching:
+            return {
+                'id': camera_id,
+                'name': f'Camera {camera_id}',
+                'resolution': 'Unknown',
+                'status': 'switching'
+            }
+        
+        if not camera or not camera.isOpened():
             return {
                 'id': None,
                 'name': 'No camera active',
@@ -324,23 +522,30 @@ class CameraManager:
                 'status': 'inactive'
             }
         
+        # Properties only change when the handle is replaced, so query the driver once per handle
+        info_cache = self._info_cache
+        if info_cache is not None and self._info_cache_camera is camera and info_cache['id'] == camera_id:
+            return dict(info_cache)
+        
         try:
-            width = int(self.current_camera.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(self.current_camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = int(self.current_camera.get(cv2.CAP_PROP_FPS))
+            width = int(camera.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fps = int(camera.get(cv2.CAP_PROP_FPS))
             
-            return {
-                'id': self.current_camera_id,
-                'name': f'Camera {self.current_camera_id}',
+            info_cache = {
+                'id': camera_id,
+                'name': f'Camera {camera_id}',
                 'resolution': f'{width}x{height}',
                 'fps': fps if fps > 0 else 30,
                 'status': 'active'
             }
+            self._info_cache, self._info_cache_camera = info_cache, camera
+            return dict(info_cache)
         except Exception as e:
             print(f"❌ Error getting camera info: {e}")
             return {
-                'id': self.current_camera_id,
-                'name': f'Camera {self.current_camera_id}',
+                'id': camera_id,
+                'name': f'Camera {camera_id}',
                 'resolution': 'Unknown',
                 'status': 'error'
             }
@@ -364,63 +569,44 @@ class CameraManager:
         
         try:
             # Release current camera completely
+            reader_stopped = self._stop_reader()
             if self.current_camera:
                 try:
                     print(f"🔄 Releasing current camera {self.current_camera_id}")
-                    self.current_camera.release()
-                    time.sleep(1.5)  # Wait longer for camera to be fully released
+                    self._release_capture(self.current_camera, reader_stopped)
                 except Exception as release_error:
                     print(f"❌ Error releasing camera during init: {release_error}")
                 finally:
                     self.current_camera = None
             
             # Try to initialize new camera with platform-specific backend
-            import platform
-            if platform.system() == "Windows":
-                new_cap = cv2.VideoCapture(camera_id, cv2.CAP_DSHOW)
-                print(f"🔄 Using DirectShow backend for camera {camera_id}")
-            else:
-                new_cap = cv2.VideoCapture(camera_id)
-                print(f"🔄 Using default backend for camera {camera_id}")
+            new_cap = self._open_with_retry(camera_id)
             
-            if new_cap.isOpened():
-                print(f"✅ Camera {camera_id} opened successfully")
-                
-                # Test camera by reading a frame with timeout
-                import threading
-                import queue
-                
-                def read_frame_timeout(cap, result_queue):
-                    try:
-                        ret, frame = cap.read()
-                        result_queue.put((ret, frame))
-                    except Exception as e:
-                        result_queue.put((False, None))
+            if new_cap is not None:
+                print(f"✅ Camera {camera_id} opened successfully ({new_cap.getBackendName()})")
+                self._configure_capture(new_cap, camera_id)
                 
-                result_queue = queue.Queue()
-                thread = threading.Thread(target=read_frame_timeout, args=(new_cap, result_queue))
-                thread.start()
-                thread.join(timeout=3.0)  # 3 second timeout
-                
-                if thread.is_alive():
+                # Test camera with grab() (no decode) and retrieve only once a frame is there
+                ret, frame = False, None
+                deadline = time.monotonic() + 3.0  # 3 second timeout
+                while time.monotonic() < deadline:
+                    if new_cap.grab():
+                        ret, frame = new_cap.retrieve()
+                        break
+                    time.sleep(0.01)
+                else:
                     print(f"❌ Camera {camera_id} frame read timeout")
                     new_cap.release()
                     return False
                 
-                try:
-                    ret, frame = result_queue.get_nowait()
-                except queue.Empty:
-                    print(f"❌ Camera {camera_id} no frame result")
-                    new_cap.release()
-                    return False
-                
-                if ret and frame is not None and len(frame.shape) >= 2:
+                if ret and frame is not None:
                     height, width = frame.shape[:2]
                     print(f"✅ Camera {camera_id} frame test passed: {width}x{height}")
                     
                     # Success! Set as current camera
                     self.current_camera = new_cap
                     self.current_camera_id = camera_id
+                    self._start_reader()
                     
                     print(f"✅ Camera {camera_id} initialization completed successfully")
                     return True
@@ -430,53 +616,211 @@ class CameraManager:
                     return False
             else:
                 print(f"❌ Cannot open Camera {camera_id}")
-                new_cap.release()
                 return False
                 
         except Exception as e:
             print(f"❌ Error initializing camera {camera_id}: {e}")
+            reader_stopped = self._stop_reader()
             if self.current_camera:
                 try:
-                    self.current_camera.release()
+                    self._release_capture(self.current_camera, reader_stopped)
                 except:
                     pass
                 self.current_camera = None
             return False
     
-    def read_frame(self):
+    def read_frame(self, timeout: float = 0.05):
         """
-        Read a frame from the current camera with optimized error handling.
+        Return the newest frame published by the background reader.
         
+        Each frame is handed out only once, so the caller owns it and may draw on it in place.
+        When no new frame is there yet, wait up to timeout for the reader to publish one.
+        
+        Args:
+            timeout: Seconds to wait for a new frame
+            
         Returns:
-            Tuple of (success, frame) or (False, None) if no camera
+            Tuple of (success, frame) or (False, None) if no frame arrived in time; use
+            is_reading() to tell a healthy camera between frames from a failed one
         """
-        if not self.current_camera or not self.current_camera.isOpened():
-            return False, None
+        with self._frame_ready:
+            if not self._latest and self._reader_error is None and self._reader_thread is not None:
+                self._frame_ready.wait_for(lambda: self._latest or self._reader_error is not None, timeout)
         
-        try:
-            ret, frame = self.current_camera.read()
+        error = self._reader_error
+        if error is not None:
+            self._reader_error = None
+            if self._throttle('read_frame_error'):
+                logger.warning("❌ Error reading frame from Camera %s: %s", self.current_camera_id, error)
             
-            # Check if frame is valid
-            if not ret or frame is None:
+            # Only try to reconnect for specific MSMF errors, not all errors
+            # This reduces unnecessary reconnection attempts that cause lag
+            if "cap_msmf.cpp" in str(error) and "grabFrame" in str(error):
+                self.initialize_camera(self.current_camera_id)
+            return False, None
+        
+        with self._frame_lock:
+            if not self._latest:
                 return False, None
-                
-            return ret, frame
+            return True, self._latest.pop()
+    
+    def is_reading(self) -> bool:
+        """
+        Check whether the background reader is running without errors.
+        
+        Returns:
+            True if a (False, None) from read_frame only means the next frame has not arrived yet
+        """
+        thread = self._reader_thread
+        return thread is not None and thread.is_alive() and self._reader_error is None
+    
+    def peek_frame(self, out=None):
+        """
+        Copy the newest frame without taking it away from read_frame callers.
+        
+        Only frames no read_frame caller has claimed yet are visible here.
+        
+        Args:
+            out: Optional array to copy into when its shape and dtype match
             
-        except Exception as e:
-            print(f"❌ Error reading frame from Camera {self.current_camera_id}: {e}")
+        Returns:
+            Tuple of (sequence number, frame) or (sequence number, None) if no frame is waiting
+        """
+        with self._frame_lock:
+            if not self._latest:
+                return self._frame_seq, None
+            src = self._latest[0]
+            # Copy under the lock: once popped, the owner may draw on it or hand it back for reuse
+            if out is None or out.shape != src.shape or out.dtype != src.dtype:
+                out = src.copy()
+            else:
+                out[...] = src
+            return self._frame_seq, out
+    
+    def release_frame(self, frame):
+        """
+        Hand a frame from read_frame back for reuse by the reader.
+        
+        Only call this once nothing holds a reference to the frame any more; its
+        pixels are overwritten by a later read.
+        
+        Args:
+            frame: Frame previously returned by read_frame
+        """
+        if frame is not None:
+            self._free_frames.append(frame)
+    
+    def _throttle(self, key: str, period: float = 1.0) -> bool:
+        """
+        Rate-limit a repeating log message.
+        
+        Args:
+            key: Identifies the message being limited
+            period: Minimum seconds between two emitted messages
             
-            # Only try to reconnect for specific MSMF errors, not all errors
-            # This reduces unnecessary reconnection attempts that cause lag
-            if "cap_msmf.cpp" in str(e) and "grabFrame" in str(e):
-                success = self.initialize_camera(self.current_camera_id)
-                if success:
+        Returns:
+            True if the message should be logged now
+        """
+        now = time.monotonic()
+        if now - self._last_log.get(key, 0.0) > period:
+            self._last_log[key] = now
+            return True
+        return False
+    
+    def _start_reader(self):
+        """
+        Start the background thread that keeps grabbing from the current camera.
+        """
+        self._stop_reader()
+        # Fresh event per thread so a reader stuck in grab() past the join timeout still exits
+        self._stop = threading.Event()
+        self._reader_state = {'exited': False, 'orphaned': False}
+        self._reader_thread = threading.Thread(target=self._reader_loop,
+                                               args=(self.current_camera, self._stop, self._reader_state),
+                                               daemon=True)
+        self._reader_thread.start()
+    
+    def _stop_reader(self) -> bool:
+        """
+        Stop the background reader and forget its last frame; must run before the handle is released.
+        
+        Returns:
+            True if the reader has exited and the caller may release the handle, False if it is
+            still stuck in grab() and will release the handle itself once that returns
+        """
+        self._stop.set()
+        thread = self._reader_thread
+        state = self._reader_state
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+        self._reader_thread = None
+        with self._frame_lock:
+            self._latest.clear()
+        self._free_frames.clear()
+        with self._reader_state_lock:
+            if state['exited']:
+                return True
+            state['orphaned'] = True
+            return False
+    
+    def _release_capture(self, cap, reader_stopped: bool):
+        """
+        Release a capture handle unless a reader that could not be stopped still uses it.
+        
+        Args:
+            cap: VideoCapture to release
+            reader_stopped: Result of the _stop_reader() call made for this handle
+        """
+        if reader_stopped:
+            cap.release()
+        else:
+            print("⚠️ Camera reader still blocked in grab(), it will release the handle when it returns")
+    
+    def _reader_loop(self, cap, stop, state):
+        # Bound to one handle so a switch never makes it touch a released capture
+        try:
+            self._read_until_stopped(cap, stop)
+        finally:
+            with self._reader_state_lock:
+                state['exited'] = True
+                orphaned = state['orphaned']
+            if orphaned:
+                # _stop_reader() gave up waiting, so the handle is ours to release
+                try:
+                    cap.release()
+                except Exception as e:
+                    logger.debug("Releasing orphaned camera handle failed: %s", e)
+    
+    def _read_until_stopped(self, cap, stop):
+        grabbed = 0
+        while not stop.is_set():
+            try:
+                if cap.grab():
+                    grabbed += 1
+                    if grabbed % self._decode_every:
+                        # grab() already advanced the stream, skip the decode
+                        continue
                     try:
-                        ret, frame = self.current_camera.read()
-                        return ret, frame
-                    except:
-                        pass
-            
-            return False, None
+                        buf = self._free_frames.pop()
+                    except IndexError:
+                        buf = None
+                    # retrieve() writes into buf in place when the size matches, else allocates
+                    ok, frame = cap.retrieve(buf) if buf is not None else cap.retrieve()
+                    if ok and frame is not None:
+                        with self._frame_lock:
+                            if self._latest:
+                                # Never handed out, so it is safe to decode into next time
+                                self._free_frames.append(self._latest.pop())
+                            self._latest.append(frame)
+                            self._frame_seq += 1
+                            self._frame_ready.notify_all()
+                        continue
+                time.sleep(0.005)
+            except Exception as e:
+                with self._frame_ready:
+                    self._reader_error = e
+                    self._frame_ready.notify_all()
+                return
     
     def release_camera(self):
         """
@@ -489,14 +833,20 @@ class CameraManager:
         Release the current camera completely.
         """
         with self.lock:
+            reader_stopped = self._stop_reader()
             if self.current_camera:
                 try:
-                    self.current_camera.release()
-                    time.sleep(0.5)  # Wait for camera to be fully released
+                    # A reader still stuck in grab() owns the handle, so do not touch it at all
+                    backend = self.current_camera.getBackendName() if reader_stopped else None
+                    self._release_capture(self.current_camera, reader_stopped)
+                    if backend == 'MSMF':
+                        time.sleep(0.05)  # MSMF needs a moment before the device can be reopened
                 except Exception as e:
                     print(f"❌ Error releasing camera: {e}")
                 finally:
                     self.current_camera = None
+                    self._info_cache = None
+                    self._info_cache_camera = None
         
     def __del__(self):
         """
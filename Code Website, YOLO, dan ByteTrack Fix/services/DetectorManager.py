@@ -1,15 +1,133 @@
+import collections
 import cv2
+import functools
+import gc
 import time
 import threading
 import numpy as np
+import torch
 import json
+import logging
 import os
 from CameraManager import CameraManager
+from ProductDetector import ProductDetector
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on entries kept in objects_in_zone / counted_objects; the least recently seen go first
+MAX_TRACKED_OBJECTS = 4096
+# Seconds between stale-track sweeps; object_timeout is 2 s, so a 0.5 s delay is harmless
+CLEANUP_INTERVAL = 0.5
+
+@functools.lru_cache(maxsize=64)
+def _hex_to_bgr_cached(hex_color):
+    # Colours come from a handful of config strings, so parse each one once
+    hex_color = hex_color.lstrip('#')
+    return (int(hex_color[4:6], 16), int(hex_color[2:4], 16), int(hex_color[0:2], 16))
+
+
+@functools.lru_cache(maxsize=256)
+def _text_size(text, font_scale, thickness):
+    # Labels come from the small product vocabulary, so measure each string once
+    return cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)[0]
+
+
+@functools.lru_cache(maxsize=256)
+def _text_mask(text, font_scale, thickness):
+    # Rasterize the glyphs once; returns the pixel mask and its offset from the putText origin
+    (width, height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+    pad = thickness
+    mask = np.zeros((height + baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+    cv2.putText(mask, text, (pad, pad + height), cv2.FONT_HERSHEY_SIMPLEX, font_scale, 255, thickness)
+    mask = mask.astype(bool)
+    mask.flags.writeable = False
+    return mask, -pad, -(pad + height)
+
+
+def _put_text(frame, text, org, font_scale, color, thickness):
+    # Same pixels as cv2.putText (default LINE_8, one solid colour), but repeated text is a masked copy
+    mask, dx, dy = _text_mask(text, font_scale, thickness)
+    x0, y0 = org[0] + dx, org[1] + dy
+    fx0, fy0 = max(x0, 0), max(y0, 0)
+    fx1 = min(x0 + mask.shape[1], frame.shape[1])
+    fy1 = min(y0 + mask.shape[0], frame.shape[0])
+    if fx0 >= fx1 or fy0 >= fy1:
+        return
+    frame[fy0:fy1, fx0:fx1][mask[fy0 - y0:fy1 - y0, fx0 - x0:fx1 - x0]] = color
+
+
+def _iou_matrix(boxes_a, boxes_b):
+    # (N, M) IoU of every (N, 4) box against every (M, 4) box in a single NumPy pass
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+def _rect_corners(x1, y1, x2, y2):
+    # (N, 4, 2) int32 corner polygons for N boxes, the layout cv2.polylines / cv2.fillPoly take
+    return np.stack((np.stack((x1, y1), axis=1), np.stack((x2, y1), axis=1),
+                     np.stack((x2, y2), axis=1), np.stack((x1, y2), axis=1)), axis=1).astype(np.int32)
+
+
+class TrackState:
+    """Detections kept from the previous frame, stored as parallel arrays (one row per object)"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ids = []
+        self.labels = np.empty(0, dtype=object)
+        self.boxes = np.empty((0, 4), dtype=np.float32)
+        self.last_seen = np.empty(0, dtype=np.float64)
+        self.in_zone = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def replace(self, detections):
+        # detections: obj_id -> {'label', 'box', 'timestamp', 'in_zone', ...} built for the current frame
+        rows = list(detections.values())
+        self.ids = list(detections.keys())
+        self.labels = np.array([row['label'] for row in rows], dtype=object)
+        self.boxes = np.array([row['box'] for row in rows], dtype=np.float32).reshape(-1, 4)
+        self.last_seen = np.array([row['timestamp'] for row in rows], dtype=np.float64)
+        self.in_zone = np.array([row['in_zone'] for row in rows], dtype=bool)
+
+    def match(self, boxes, labels, threshold):
+        # For each (box, label) the id with the best same-label IoU, or None if nothing beats the threshold
+        if not self.ids or not labels:
+            return [None] * len(labels)
+        ious = _iou_matrix(np.asarray(boxes, dtype=np.float32).reshape(-1, 4), self.boxes)
+        same_label = np.array(labels, dtype=object)[:, None] == self.labels[None, :]
+        ious = np.where(same_label, ious, 0.0)
+        best = ious.argmax(axis=1)
+        best_iou = ious[np.arange(len(labels)), best]
+        return [self.ids[j] if iou > threshold else None
+                for j, iou in zip(best.tolist(), best_iou.tolist())]
+
+    def prune(self, now, timeout):
+        # Drop rows not seen within timeout and return their ids
+        keep = (now - self.last_seen) <= timeout
+        if keep.all():
+            return []
+        removed = [self.ids[i] for i in np.flatnonzero(~keep)]
+        self.ids = [self.ids[i] for i in np.flatnonzero(keep)]
+        self.labels = self.labels[keep]
+        self.boxes = self.boxes[keep]
+        self.last_seen = self.last_seen[keep]
+        self.in_zone = self.in_zone[keep]
+        return removed
 
 
 class DetectorManager:
     def __init__(self, model_path, product_manager, firestore_manager=None, camera_manager=None):
-        from ProductDetector import ProductDetector
         self.detector = ProductDetector(model_path=model_path)
         self.product_manager = product_manager
         self.firestore_manager = firestore_manager
@@ -18,11 +136,31 @@ class DetectorManager:
         self.lock = threading.Lock()
         self.zone_start_percent = 70
         self.zone_width_percent = 20
-
-        self.objects_in_zone = {}
-        self.counted_objects = {}
-        self.last_detections = {}
+        # (x, width, y, height) of the counting zone for the last frame size / zone settings seen
+        self._zone_cache_key = None
+        self._zone_cache = None
+        # message key -> monotonic time it was last logged, see _throttle
+        self._last_log = {}
+        # Connected clients watching the stream; with none, frames are processed but not drawn on
+        self.viewer_count = 0
+        self._viewer_lock = threading.Lock()
+        # monotonic time of the last single-frame request (/current_frame), see viewer_polled
+        self._last_viewer_poll = float('-inf')
+
+        # OrderedDicts so the least recently seen objects can be evicted, see _trim_tracking_state
+        self.objects_in_zone = collections.OrderedDict()
+        # Number of True values in objects_in_zone, kept in step with every write to it
+        self._in_zone_count = 0
+        self.counted_objects = collections.OrderedDict()
+        # Tracker IDs already added to the cart, whatever label they were counted under
+        self.counted_track_ids = set()
+        self.tracks = TrackState()
+        self._product_catalog_version = -1
+        self._valid_labels = frozenset()
         self.object_timeout = 2.0
+        self._last_cleanup = 0.0
+        # Solid zone-colour block reused for the counting-zone blend
+        self._zone_tint = None
 
         self.simulation_mode = False
         self.simulated_objects = {}
@@ -73,7 +211,17 @@ class DetectorManager:
         }
 
         self.config_file = 'detection_config.json'
+        # Loaded before __init__ returns, so camera startup and the processing loop see the final config
         self.load_config_from_sources()
+        self.camera_manager.set_requested_resolution(self.config['advanced']['resolution'])
+        self.camera_manager.set_decode_every(self._decode_interval(self.config['advanced'].get('frameRate', 30)))
+
+        # save_config_debounced: UI edit bursts are written by a background thread, see flush_config
+        self._config_dirty = threading.Event()
+        self._config_save_lock = threading.Lock()
+        self._pending_config = None
+        self._pending_config_callbacks = []
+        self._config_writer = None
 
     def set_zone_parameters(self, start_percent, width_percent):
         self.zone_start_percent = start_percent
@@ -124,12 +272,30 @@ class DetectorManager:
         with self.lock:
             if obj_id in self.simulated_objects:
                 del self.simulated_objects[obj_id]
-                self.objects_in_zone.pop(obj_id, None)
+                if self.objects_in_zone.pop(obj_id, False):
+                    self._in_zone_count -= 1
                 self.counted_objects.pop(obj_id, None)
                 return True
             return False
 
+    def viewer_attached(self):
+        with self._viewer_lock:
+            self.viewer_count += 1
+
+    def viewer_detached(self):
+        with self._viewer_lock:
+            self.viewer_count = max(0, self.viewer_count - 1)
+
+    def viewer_polled(self):
+        # Polling clients hold no connection open, so count them as watching for a short while
+        self._last_viewer_poll = time.monotonic()
+
+    def has_viewers(self, poll_window=2.0):
+        return self.viewer_count > 0 or time.monotonic() - self._last_viewer_poll < poll_window
+
     def get_simulated_objects(self):
+        # No lock: writers hold self.lock, and dict.copy() runs in C without releasing the GIL,
+        # so status endpoints never wait on the detection loop
         return self.simulated_objects.copy()
 
     def start_scanning(self):
@@ -137,8 +303,10 @@ class DetectorManager:
             self.detector.clear_cart()
             self.is_scanning = True
             self.objects_in_zone.clear()
+            self._in_zone_count = 0
             self.counted_objects.clear()
-            self.last_detections.clear()
+            self.counted_track_ids.clear()
+            self.tracks.clear()
 
     def stop_scanning(self):
         with self.lock:
@@ -154,8 +322,10 @@ class DetectorManager:
                 if 'zoneWidth' in config:
                     self.zone_width_percent = config['zoneWidth']
 
-                self.detector.set_detection_threshold(config.get('threshold', 0.5))
-                self.detector.set_auto_count(config.get('autoCount', True))
+                self.detector.apply_settings({
+                    'threshold': config.get('threshold', 0.5),
+                    'autoCount': config.get('autoCount', True)
+                })
 
                 return True
         except Exception as e:
@@ -167,14 +337,17 @@ class DetectorManager:
             with self.lock:
                 self.config['visual'].update(config)
 
-                self.detector.set_show_boxes(config.get('showBoxes', True))
-                self.detector.set_show_labels(config.get('showLabels', True))
-                self.detector.set_show_confidence(config.get('showConfidence', True))
-                self.detector.set_show_overlays(config.get('showOverlays', True))
-                self.detector.set_show_all_detections(config.get('showAllDetections', False))
-                self.detector.set_zone_color(config.get('zoneColor', '#ff0000'))
-                self.detector.set_box_color(config.get('boxColor', '#00ff00'))
-                self.detector.set_zone_opacity(config.get('zoneOpacity', 0.2))
+                # Values the detector already has are skipped, so re-sent UI settings are a no-op
+                self.detector.apply_settings({
+                    'showBoxes': config.get('showBoxes', True),
+                    'showLabels': config.get('showLabels', True),
+                    'showConfidence': config.get('showConfidence', True),
+                    'showOverlays': config.get('showOverlays', True),
+                    'showAllDetections': config.get('showAllDetections', False),
+                    'zoneColor': config.get('zoneColor', '#ff0000'),
+                    'boxColor': config.get('boxColor', '#00ff00'),
+                    'zoneOpacity': config.get('zoneOpacity', 0.2)
+                })
 
                 return True
         except Exception as e:
@@ -186,20 +359,23 @@ class DetectorManager:
             with self.lock:
                 self.config['advanced'].update(config)
 
+                self.detector.apply_settings({k: config[k] for k in ('resolution', 'frameRate', 'model', 'processingSpeed')
+                                              if k in config})
                 if 'resolution' in config:
-                    self.detector.set_resolution(config['resolution'])
+                    self.camera_manager.set_requested_resolution(config['resolution'])
                 if 'frameRate' in config:
-                    self.detector.set_frame_rate(config['frameRate'])
-                if 'model' in config:
-                    self.detector.set_model(config['model'])
-                if 'processingSpeed' in config:
-                    self.detector.set_processing_speed(config['processingSpeed'])
+                    self.camera_manager.set_decode_every(self._decode_interval(config['frameRate']))
 
                 return True
         except Exception as e:
             print(f"Error applying advanced config: {e}")
             return False
 
+    @staticmethod
+    def _decode_interval(frame_rate):
+        # Cameras deliver ~30 FPS; decode only as many frames as the configured rate needs
+        return max(1, int(30 / max(1, frame_rate)))
+
     def apply_preset_config(self, preset_name):
         try:
             if preset_name in self.presets:
@@ -249,6 +425,47 @@ class DetectorManager:
             print(f"[ERROR] Error saving config: {e}")
             return False
 
+    def save_config_debounced(self, on_result=None):
+        """Queue a save of the current config; edits within 0.5 s of each other become one write.
+        on_result(success) is called once that write has been attempted."""
+        if not (self.firestore_manager and self.firestore_manager.is_connected()):
+            if on_result:
+                on_result(False)
+            return False
+        with self._config_save_lock:
+            self._pending_config = self.config
+            if on_result:
+                self._pending_config_callbacks.append(on_result)
+            if self._config_writer is None:
+                self._config_writer = threading.Thread(target=self._config_writer_loop, daemon=True)
+                self._config_writer.start()
+        self._config_dirty.set()
+        return True
+
+    def flush_config(self):
+        """Write a queued save_config_debounced config now; True when nothing is left unsaved"""
+        with self._config_save_lock:
+            config_to_save, callbacks = self._pending_config, self._pending_config_callbacks
+            self._pending_config, self._pending_config_callbacks = None, []
+        if config_to_save is None:
+            return True
+        success = self.save_config(config_to_save)
+        if not success:
+            print("[ERROR] Firebase rejected config save")
+        for callback in callbacks:
+            try:
+                callback(success)
+            except Exception as e:
+                print(f"[ERROR] Config save callback failed: {e}")
+        return success
+
+    def _config_writer_loop(self):
+        while True:
+            self._config_dirty.wait()
+            self._config_dirty.clear()
+            time.sleep(0.5)  # Coalesce rapid UI changes into a single write
+            self.flush_config()
+
     def load_config_from_sources(self):
         """Load config from Firebase only"""
         try:
@@ -312,92 +529,104 @@ class DetectorManager:
     def get_current_config(self):
         return self.config.copy()
 
-    def _calculate_iou(self, box1, box2):
-        x1_1, y1_1, x2_1, y2_1 = box1
-        x1_2, y1_2, x2_2, y2_2 = box2
-
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return 0.0
-
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
-        area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
-        area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
-
-        return intersection / union if union > 0 else 0.0
-
-    def _find_matching_object(self, detection, label):
-        best_match = None
-        best_iou = 0.0
-        threshold = 0.3
-
-        for tracked_id, tracked_data in self.last_detections.items():
-            if tracked_data['label'] != label:
-                continue
-
-            iou = self._calculate_iou(detection['box'], tracked_data['box'])
-            if iou > threshold and iou > best_iou:
-                best_iou = iou
-                best_match = tracked_id
-
-        return best_match
+    def _throttle(self, key, period=1.0):
+        # Frame errors repeat at the camera rate, let each message through at most once per period
+        now = time.monotonic()
+        if now - self._last_log.get(key, 0.0) > period:
+            self._last_log[key] = now
+            return True
+        return False
+
+    def _refresh_product_catalog(self):
+        # Products change rarely, only hand the detector a new catalog when ProductManager reports a change
+        version = self.product_manager.get_version()
+        if version != self._product_catalog_version:
+            products = self.product_manager.get_products()
+            self.detector.set_product_catalog(products)
+            self._valid_labels = frozenset(products)
+            self._product_catalog_version = version
+
+    def _match_untracked(self, detected_objects):
+        # Previous-frame id for every detection without a tracker ID, matched in one batch;
+        # aligned with detected_objects, None for tracked or unmatched detections
+        untracked = [i for i, obj in enumerate(detected_objects) if obj.get('track_id') is None]
+        found = self.tracks.match([detected_objects[i]['box'] for i in untracked],
+                                  [detected_objects[i]['label'] for i in untracked], threshold=0.3)
+        matches = [None] * len(detected_objects)
+        for i, matched_id in zip(untracked, found):
+            matches[i] = matched_id
+        return matches
 
     def _cleanup_old_objects(self, current_time):
-        to_remove = []
-        for obj_id, last_time in list(self.last_detections.items()):
-            if current_time - last_time['timestamp'] > self.object_timeout:
-                to_remove.append(obj_id)
-
-        for obj_id in to_remove:
-            self.last_detections.pop(obj_id, None)
-            self.objects_in_zone.pop(obj_id, None)
+        for obj_id in self.tracks.prune(current_time, self.object_timeout):
+            if self.objects_in_zone.pop(obj_id, False):
+                self._in_zone_count -= 1
+
+    def _trim_tracking_state(self):
+        # Front of each OrderedDict is the least recently written; live objects were just moved to the end
+        while len(self.objects_in_zone) > MAX_TRACKED_OBJECTS:
+            _, in_zone = self.objects_in_zone.popitem(last=False)
+            if in_zone:
+                self._in_zone_count -= 1
+        while len(self.counted_objects) > MAX_TRACKED_OBJECTS:
+            self.counted_objects.popitem(last=False)
 
-    def _process_simulated_objects(self, frame, frame_width, frame_height):
+    def _process_simulated_objects(self, frame, frame_width, frame_height, draw=True):
         current_time = time.time()
         detected_objects = []
 
-        zone_mode = self.config['detection'].get('zoneMode', 'vertical')
-
-        for obj_id, obj_data in self.simulated_objects.items():
-            x = obj_data['x']
-            y = obj_data['y']
-            w = obj_data['width']
-            h = obj_data['height']
+        # Settings are constant for the whole frame, read them once
+        visual = self.config['visual']
+        detection = self.config['detection']
+        show_boxes = draw and visual['showBoxes']
+        show_labels = draw and visual['showLabels']
+        show_confidence = visual['showConfidence']
+        show_overlays = visual['showOverlays']
+        auto_count = detection['autoCount']
+        box_color = _hex_to_bgr_cached(visual['boxColor'])
+        invalid_color = (0, 165, 255)
+        valid_labels = self._valid_labels
+
+        zone_mode = detection.get('zoneMode', 'vertical')
+
+        # Clip boxes, find centers and test the zone for all objects at once
+        sim_items = list(self.simulated_objects.items())
+        geometry = np.array([(o['x'], o['y'], o['width'], o['height']) for _, o in sim_items],
+                            dtype=np.int32).reshape(-1, 4)
+        x1s = np.maximum(geometry[:, 0], 0)
+        y1s = np.maximum(geometry[:, 1], 0)
+        x2s = np.minimum(geometry[:, 0] + geometry[:, 2], frame_width)
+        y2s = np.minimum(geometry[:, 1] + geometry[:, 3], frame_height)
+        centers = np.stack(((x1s + x2s) // 2, (y1s + y2s) // 2), axis=1)
+        boxes = np.stack((x1s, y1s, x2s, y2s), axis=1).tolist()
+        in_zone_flags = self._zone_membership(centers, zone_mode, frame_width, frame_height)
+        valid_flags = [obj_data['label'] in valid_labels for _, obj_data in sim_items]
+        valid_mask = np.array(valid_flags, dtype=bool)
+        colored = ((box_color, valid_mask), (invalid_color, ~valid_mask))
+
+        # One polylines / fillPoly call per colour instead of a cv2 call per object
+        if show_boxes:
+            outlines = _rect_corners(x1s, y1s, x2s, y2s)
+            for color, mask in colored:
+                if mask.any():
+                    cv2.polylines(frame, outlines[mask], True, color, 2)
+
+        if show_labels:
+            confidence_text = ": 1.00" if show_confidence else ""
+            texts = [f"[SIM] {obj_data['label']}{confidence_text}" for _, obj_data in sim_items]
+            text_widths = np.array([_text_size(text, 0.6, 2)[0] for text in texts], dtype=np.int32)
+            text_bgs = _rect_corners(x1s, np.where(y1s - 25 > 0, y1s - 25, 0), x1s + text_widths + 10, y1s)
+            for color, mask in colored:
+                if mask.any():
+                    cv2.fillPoly(frame, text_bgs[mask], color)
+            if show_overlays:
+                for text, (x1, y1, _, _) in zip(texts, boxes):
+                    _put_text(frame, text, (x1 + 5, y1 - 8), 0.6, (0, 0, 0), 2)
+
+        for (obj_id, obj_data), (x1, y1, x2, y2), (center_x, center_y), in_zone, is_valid_product in zip(
+                sim_items, boxes, centers.tolist(), in_zone_flags, valid_flags):
             label = obj_data['label']
 
-            x1 = max(0, x)
-            y1 = max(0, y)
-            x2 = min(frame_width, x + w)
-            y2 = min(frame_height, y + h)
-            center_x = (x1 + x2) // 2
-            center_y = (y1 + y2) // 2
-
-            is_valid_product = label in self.product_manager.get_products()
-
-            if self.config['visual']['showBoxes']:
-                color = self._hex_to_bgr(self.config['visual']['boxColor']) if is_valid_product else (0, 165, 255)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-
-            if self.config['visual']['showLabels']:
-                confidence_text = ": 1.00" if self.config['visual']['showConfidence'] else ""
-                text = f"[SIM] {label}{confidence_text}"
-                text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-
-                text_bg_x1 = x1
-                text_bg_y1 = y1 - 25 if y1 - 25 > 0 else 0
-                text_bg_x2 = x1 + text_size[0] + 10
-                text_bg_y2 = y1
-
-                color = self._hex_to_bgr(self.config['visual']['boxColor']) if is_valid_product else (0, 165, 255)
-                cv2.rectangle(frame, (text_bg_x1, text_bg_y1), (text_bg_x2, text_bg_y2), color, -1)
-                if self.config['visual']['showOverlays']:
-                    cv2.putText(frame, text, (x1 + 5, y1 - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
-
             if is_valid_product:
                 detected_objects.append({
                     'label': label,
@@ -407,96 +636,116 @@ class DetectorManager:
                     'confidence': 1.0  # Simulation objects have perfect confidence
                 })
 
-            # Zone detection based on mode
-            if zone_mode == 'vertical':
-                counting_zone_x = int(frame_width * self.zone_start_percent / 100)
-                counting_zone_width = int(frame_width * self.zone_width_percent / 100)
-                in_zone = (center_x > counting_zone_x and
-                           center_x < counting_zone_x + counting_zone_width)
-            else:  # horizontal
-                counting_zone_y = int(frame_height * self.zone_start_percent / 100)
-                counting_zone_height = int(frame_height * self.zone_width_percent / 100)
-                in_zone = (center_y > counting_zone_y and
-                           center_y < counting_zone_y + counting_zone_height)
-
-            was_in_zone = self.objects_in_zone.get(obj_id, False)
+            # pop + re-insert below: one probe each and the entry lands at the LRU end
+            was_in_zone = self.objects_in_zone.pop(obj_id, False)
             already_counted = self.counted_objects.get(obj_id, False)
 
             if in_zone:
-                if not was_in_zone and not already_counted and is_valid_product and self.config['detection']['autoCount']:
+                if not was_in_zone and not already_counted and is_valid_product and auto_count:
                     self.detector.add_to_cart(label)
                     self.counted_objects[obj_id] = True
                     pass
 
+                if not was_in_zone:
+                    self._in_zone_count += 1
                 self.objects_in_zone[obj_id] = True
-                cv2.circle(frame, (center_x, center_y), 8, (0, 255, 255), -1)
+                if draw:
+                    cv2.circle(frame, (center_x, center_y), 8, (0, 255, 255), -1)
             else:
                 if was_in_zone:
                     self.counted_objects.pop(obj_id, None)
+                    self._in_zone_count -= 1
                 self.objects_in_zone[obj_id] = False
 
+        self._trim_tracking_state()
         return frame, detected_objects
 
+    def _get_zone_rect(self, frame_width, frame_height):
+        # Only recomputed when the frame size or zone percentages change
+        key = (frame_width, frame_height, self.zone_start_percent, self.zone_width_percent)
+        if key != self._zone_cache_key:
+            self._zone_cache = (int(frame_width * self.zone_start_percent / 100),
+                                int(frame_width * self.zone_width_percent / 100),
+                                int(frame_height * self.zone_start_percent / 100),
+                                int(frame_height * self.zone_width_percent / 100))
+            self._zone_cache_key = key
+        return self._zone_cache
+
+    def _zone_membership(self, centers, zone_mode, frame_width, frame_height):
+        # One vectorized comparison for every (x, y) center instead of a Python test per object
+        centers = np.asarray(centers, dtype=np.int32).reshape(-1, 2)
+        zone_x, zone_w, zone_y, zone_h = self._get_zone_rect(frame_width, frame_height)
+        if zone_mode == 'vertical':
+            zone_start, zone_size = zone_x, zone_w
+            coords = centers[:, 0]
+        else:  # horizontal
+            zone_start, zone_size = zone_y, zone_h
+            coords = centers[:, 1]
+        return ((coords > zone_start) & (coords < zone_start + zone_size)).tolist()
+
     def _hex_to_bgr(self, hex_color):
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (4, 2, 0))
+        return _hex_to_bgr_cached(hex_color)
 
     def _draw_zone_overlay(self, frame, frame_width, frame_height):
         if not self.config['detection']['showZone']:
             return frame
 
         zone_mode = self.config['detection'].get('zoneMode', 'vertical')
-        zone_color = self._hex_to_bgr(self.config['visual']['zoneColor'])
-        overlay = frame.copy()
+        zone_color = _hex_to_bgr_cached(self.config['visual']['zoneColor'])
         opacity = self.config['visual']['zoneOpacity']
+        counting_zone_x, counting_zone_width, counting_zone_y, counting_zone_height = \
+            self._get_zone_rect(frame_width, frame_height)
 
         if zone_mode == 'vertical':
             # Vertical mode: left-right zones
-            counting_zone_x = int(frame_width * self.zone_start_percent / 100)
-            counting_zone_width = int(frame_width * self.zone_width_percent / 100)
 
             zone_start = (counting_zone_x, 0)
             zone_end = (counting_zone_x, frame_height)
             zone_end_right = (counting_zone_x + counting_zone_width, 0)
             zone_start_right = (counting_zone_x + counting_zone_width, frame_height)
 
-            cv2.rectangle(overlay, (counting_zone_x, 0), (counting_zone_x + counting_zone_width, frame_height), zone_color, -1)
-            cv2.addWeighted(overlay, opacity, frame, 1 - opacity, 0, frame)
+            self._blend_zone(frame[:, counting_zone_x:counting_zone_x + counting_zone_width], zone_color, opacity)
             cv2.line(frame, zone_start, zone_end, zone_color, 2)
             cv2.line(frame, zone_end_right, zone_start_right, zone_color, 2)
 
             zone_text = "COUNTING ZONE (VERTIKAL)"
-            text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+            text_size = _text_size(zone_text, 0.8, 2)
             text_x = counting_zone_x + (counting_zone_width - text_size[0]) // 2
             text_y = 30
         else:
             # Horizontal mode: top-bottom zones
-            counting_zone_y = int(frame_height * self.zone_start_percent / 100)
-            counting_zone_height = int(frame_height * self.zone_width_percent / 100)
-
             zone_start = (0, counting_zone_y)
             zone_end = (frame_width, counting_zone_y)
             zone_end_bottom = (0, counting_zone_y + counting_zone_height)
             zone_start_bottom = (frame_width, counting_zone_y + counting_zone_height)
 
-            cv2.rectangle(overlay, (0, counting_zone_y), (frame_width, counting_zone_y + counting_zone_height), zone_color, -1)
-            cv2.addWeighted(overlay, opacity, frame, 1 - opacity, 0, frame)
+            self._blend_zone(frame[counting_zone_y:counting_zone_y + counting_zone_height, :], zone_color, opacity)
             cv2.line(frame, zone_start, zone_end, zone_color, 2)
             cv2.line(frame, zone_end_bottom, zone_start_bottom, zone_color, 2)
 
             zone_text = "COUNTING ZONE (HORIZONTAL)"
-            text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+            text_size = _text_size(zone_text, 0.8, 2)
             text_x = (frame_width - text_size[0]) // 2
             text_y = counting_zone_y + (counting_zone_height + text_size[1]) // 2
 
         if self.config['visual']['showOverlays']:
             cv2.rectangle(frame, (text_x - 5, text_y - text_size[1] - 5),
                           (text_x + text_size[0] + 5, text_y + 5), zone_color, -1)
-            cv2.putText(frame, zone_text, (text_x, text_y),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            _put_text(frame, zone_text, (text_x, text_y), 0.8, (255, 255, 255), 2)
 
         return frame
 
+    def _blend_zone(self, roi, zone_color, opacity):
+        # Tint only the zone slice; roi is a view, so the blend lands in the frame itself
+        if roi.size == 0:
+            return
+        tint = self._zone_tint
+        if tint is None or tint.shape != roi.shape or tuple(tint[0, 0]) != zone_color:
+            tint = np.empty_like(roi)
+            tint[:] = zone_color
+            self._zone_tint = tint
+        cv2.addWeighted(tint, opacity, roi, 1 - opacity, 0, dst=roi)
+
     def process_frame(self, frame, frame_width, frame_height):
         if frame is None:
             return None  # Let web handle blank screen
@@ -504,59 +753,58 @@ class DetectorManager:
         try:
             # Ensure frame is valid
             if len(frame.shape) != 3 or frame.shape[2] != 3:
-                print(f"Invalid frame shape: {frame.shape}")
+                if self._throttle('invalid_frame_shape'):
+                    logger.warning("Invalid frame shape: %s", frame.shape)
                 return frame
             
-            # Add timestamp and frame info for debugging
-            debug_frame = frame.copy()
-            if self.config['visual']['showOverlays']:
-                cv2.putText(debug_frame, f"Live Feed: {frame_width}x{frame_height}", 
-                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.putText(debug_frame, f"Mode: {'SCAN' if self.is_scanning else 'READY'}", 
-                           (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            # Counting below never depends on the drawing, so skip it when nobody is watching
+            draw = self.has_viewers()
+
+            # Config is constant for the whole frame, read it once
+            detection = self.config['detection']
+            show_overlays = draw and self.config['visual']['showOverlays']
+            auto_count = detection['autoCount']
+            zone_mode = detection.get('zoneMode', 'vertical')
+
+            # Add timestamp and frame info for debugging; the caller's frame is drawn on in place
+            if show_overlays:
+                _put_text(frame, f"Live Feed: {frame_width}x{frame_height}", (10, 30), 0.7, (0, 255, 0), 2)
+                _put_text(frame, f"Mode: {'SCAN' if self.is_scanning else 'READY'}", (10, 60), 0.7, (0, 255, 0), 2)
             
             if self.is_scanning:
-                self.detector.product_catalog = self.product_manager.get_products()
-                self.detector.show_overlays = self.config['visual']['showOverlays']
+                self._refresh_product_catalog()
 
                 if self.simulation_mode:
-                    processed_frame, detected_objects = self._process_simulated_objects(debug_frame, frame_width, frame_height)
+                    processed_frame, detected_objects = self._process_simulated_objects(frame, frame_width, frame_height, draw)
                 else:
-                    processed_frame, detected_objects = self.detector.detect_objects(debug_frame)
+                    processed_frame, detected_objects = self.detector.detect_objects(frame, draw)
 
                 current_time = time.time()
                 current_detections = {}
-                zone_mode = self.config['detection'].get('zoneMode', 'vertical')
-
-                for obj in detected_objects:
+                objects_in_zone = self.objects_in_zone
+                counted_objects = self.counted_objects
+                counted_track_ids = self.counted_track_ids
+                add_to_cart = self.detector.add_to_cart
+                entered = 0  # net change in the number of objects inside the zone
+                in_zone_flags = self._zone_membership([obj['center'] for obj in detected_objects],
+                                                      zone_mode, frame_width, frame_height)
+                fallback_matches = self._match_untracked(detected_objects)
+
+                for obj, in_zone, matched_id in zip(detected_objects, in_zone_flags, fallback_matches):
                     label = obj['label']
                     box = obj['box']
-                    center_x = obj['center'][0]
-                    center_y = obj['center'][1]
-
-                    # Zone detection based on mode
-                    if zone_mode == 'vertical':
-                        counting_zone_x = int(frame_width * self.zone_start_percent / 100)
-                        counting_zone_width = int(frame_width * self.zone_width_percent / 100)
-                        in_zone = (center_x > counting_zone_x and
-                                   center_x < counting_zone_x + counting_zone_width)
-                    else:  # horizontal
-                        counting_zone_y = int(frame_height * self.zone_start_percent / 100)
-                        counting_zone_height = int(frame_height * self.zone_width_percent / 100)
-                        in_zone = (center_y > counting_zone_y and
-                                   center_y < counting_zone_y + counting_zone_height)
 
                     # Use tracking ID from SimpleTracker if available
                     track_id = obj.get('track_id')
                     if track_id is not None:
-                        obj_id = f"{label}_track_{track_id}"
+                        # Tuple keys hash label and ID directly, no string formatting per detection
+                        obj_id = (label, track_id)
                     else:
                         # Fallback to old matching method
-                        matched_id = self._find_matching_object(obj, label)
                         if matched_id:
                             obj_id = matched_id
                         else:
-                            obj_id = f"{label}_{int(current_time * 1000)}_{len(current_detections)}"
+                            obj_id = (label, int(current_time * 1000), len(current_detections))
 
                     current_detections[obj_id] = {
                         'label': label,
@@ -567,78 +815,91 @@ class DetectorManager:
                         'track_id': track_id
                     }
 
-                    was_in_zone = self.objects_in_zone.get(obj_id, False)
-                    already_counted = self.counted_objects.get(obj_id, False)
+                    # pop + re-insert below: one probe each and the entry lands at the LRU end
+                    was_in_zone = objects_in_zone.pop(obj_id, False)
+                    already_counted = counted_objects.get(obj_id, False)
 
                     if in_zone:
-                        if not was_in_zone and not already_counted and self.config['detection']['autoCount']:
+                        if not was_in_zone and not already_counted and auto_count:
                             # Use tracking ID for better duplicate prevention
                             if track_id is not None:
                                 # Check if this track_id was already counted recently
-                                track_key = f"track_{track_id}"
-                                recent_tracks = {k: v for k, v in self.counted_objects.items() if track_key in k}
-                                if not recent_tracks:
-                                    self.detector.add_to_cart(label)
-                                    self.counted_objects[obj_id] = True
-                                    print(f"✅ Added {label} (Track ID: {track_id}) to cart")
+                                if track_id not in counted_track_ids:
+                                    add_to_cart(label)
+                                    counted_objects[obj_id] = True
+                                    counted_track_ids.add(track_id)
+                                    logger.debug("✅ Added %s (Track ID: %s) to cart", label, track_id)
                                 else:
-                                    print(f"⚠️ Track ID {track_id} already counted, skipping")
+                                    logger.debug("⚠️ Track ID %s already counted, skipping", track_id)
                             else:
                                 # Fallback to old method
-                                self.detector.add_to_cart(label)
-                                self.counted_objects[obj_id] = True
-                                print(f"✅ Added {label} (No Track ID) to cart")
+                                add_to_cart(label)
+                                counted_objects[obj_id] = True
+                                logger.debug("✅ Added %s (No Track ID) to cart", label)
 
-                        self.objects_in_zone[obj_id] = True
+                        if not was_in_zone:
+                            entered += 1
+                        objects_in_zone[obj_id] = True
                     else:
                         if was_in_zone and not track_id:
                             # Only remove non-tracked objects when exiting zone
-                            self.counted_objects.pop(obj_id, None)
-                        self.objects_in_zone[obj_id] = False
+                            counted_objects.pop(obj_id, None)
+                        if was_in_zone:
+                            entered -= 1
+                        objects_in_zone[obj_id] = False
+
+                self._in_zone_count += entered
 
-                self.last_detections = current_detections
-                self._cleanup_old_objects(current_time)
+                self.tracks.replace(current_detections)
+                if current_time - self._last_cleanup > CLEANUP_INTERVAL:
+                    self._cleanup_old_objects(current_time)
+                    self._last_cleanup = current_time
+                self._trim_tracking_state()
 
             else:
-                processed_frame = debug_frame.copy()
+                processed_frame = frame
 
                 if self.simulation_mode:
-                    self._process_simulated_objects(processed_frame, frame_width, frame_height)
+                    self._process_simulated_objects(processed_frame, frame_width, frame_height, draw)
 
-            processed_frame = self._draw_zone_overlay(processed_frame, frame_width, frame_height)
+            if draw:
+                processed_frame = self._draw_zone_overlay(processed_frame, frame_width, frame_height)
             
             # Add overlay text and zone
-            if self.config['visual']['showOverlays']:
+            if show_overlays:
                 mode_text = "🎮 SIMULATION MODE" if self.simulation_mode else "📹 REAL MODE"
-                zone_mode = self.config['detection'].get('zoneMode', 'vertical')
                 zone_text = "Vertikal" if zone_mode == 'vertical' else "Horizontal"
                 settings_text = f"{mode_text} | Zone {zone_text}: {self.zone_start_percent}%, Size: {self.zone_width_percent}%"
-                cv2.putText(processed_frame, settings_text, (10, frame_height - 20),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                _put_text(processed_frame, settings_text, (10, frame_height - 20), 0.6, (255, 255, 255), 2)
 
-                objects_in_zone_count = sum(1 for in_zone in self.objects_in_zone.values() if in_zone)
-                tracking_text = f"Objects in zone: {objects_in_zone_count} | Simulated objects: {len(self.simulated_objects)}"
-                cv2.putText(processed_frame, tracking_text, (10, frame_height - 50),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                tracking_text = f"Objects in zone: {self._in_zone_count} | Simulated objects: {len(self.simulated_objects)}"
+                _put_text(processed_frame, tracking_text, (10, frame_height - 50), 0.6, (255, 255, 255), 2)
 
             return processed_frame
             
         except Exception as e:
-            print(f"Error in process_frame: {e}")
+            if self._throttle('process_frame_error'):
+                logger.warning("Error in process_frame: %s", e)
             # Return None - let web handle blank screen
             return None
 
     def get_cart(self):
         return self.detector.get_cart()
 
+    def get_cart_version(self):
+        # Changes whenever the cart does, cheap to poll from the processing loop
+        return self.detector.get_cart_version()
+
     def calculate_total(self):
         return self.detector.calculate_total()
 
     def clear_cart(self):
         self.detector.clear_cart()
         self.objects_in_zone.clear()
+        self._in_zone_count = 0
         self.counted_objects.clear()
-        self.last_detections.clear()
+        self.counted_track_ids.clear()
+        self.tracks.clear()
 
     # Camera management methods
     def get_available_cameras(self):
@@ -697,61 +958,60 @@ class DetectorManager:
 
     def remove_item(self, product_name):
         with self.lock:
-            cart = self.detector.get_cart()
-            product_lower = product_name.lower()
-
-            if product_lower in cart:
-                if cart[product_lower]["quantity"] > 1:
-                    cart[product_lower]["quantity"] -= 1
-                    return True
-                else:
-                    del cart[product_lower]
-                    return True
-
-            return False
+            return self.detector.remove_from_cart(product_name.lower())
 
     def change_model(self, model_path):
         """Change the current YOLO model"""
+        # Stop scanning if active (takes self.lock itself, so not called while holding it)
+        was_scanning = self.is_scanning
+        if was_scanning:
+            self.stop_scanning()
+        
+        with self.lock:
+            old_detector = self.detector
+            # Release the old weights before loading so both models are never resident at once;
+            # the old detector stays in place (finding nothing) for any reader during the gap
+            old_detector.unload_model()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        
         try:
+            new_detector = ProductDetector(model_path=model_path)
+            # A fresh detector starts from its defaults, bring the visual settings over
+            new_detector.apply_visual_config(self.config.get('visual', {}))
+            
             with self.lock:
-                # Stop scanning if active
-                was_scanning = self.is_scanning
-                if was_scanning:
-                    self.stop_scanning()
-                
-                # Create new detector with new model
-                from ProductDetector import ProductDetector
-                new_detector = ProductDetector(model_path=model_path)
-                
-                # Replace old detector
-                old_detector = self.detector
                 self.detector = new_detector
-                
-                # Clean up old detector if needed
-                del old_detector
+                self._product_catalog_version = -1
                 
                 # Update config to reflect current model
                 if 'advanced' not in self.config:
                     self.config['advanced'] = {}
                 self.config['advanced']['model'] = model_path
-                
-                # Save updated config to Firebase and local file
-                self.save_config()
-                
-                # Clear detection state
-                self.clear_cart()
-                
-                # Resume scanning if it was active
-                if was_scanning:
-                    self.start_scanning()
-                
-                return True
+            
+            # Save updated config to Firebase and local file
+            self.save_config()
+            
+            # Clear detection state
+            self.clear_cart()
+            return True
                 
         except Exception as e:
             print(f"[ERROR] Failed to change model: {e}")
             import traceback
             traceback.print_exc()
+            # Bring the previous model back so detection keeps working
+            try:
+                old_detector.load_model()
+            except Exception as reload_error:
+                print(f"[ERROR] Failed to reload previous model {old_detector.model_path}: {reload_error}")
             return False
+        
+        finally:
+            # Resume scanning if it was active
+            if was_scanning:
+                self.start_scanning()
 
     def get_current_model(self):
         """Get the current model path"""
@@ -55,7 +55,8 @@ def download_yolov5_model():
             downloaded = 0
             
             with open(model_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+                # 1 MiB chunks: a handful of iterations and progress prints instead of thousands
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
                     if chunk:
                         f.write(chunk)
                         downloaded += len(chunk)
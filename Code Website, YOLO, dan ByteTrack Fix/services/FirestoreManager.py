@@ -3,15 +3,24 @@ from firebase_admin import credentials
 from firebase_admin import firestore
 import os
 import datetime
+import heapq
 import uuid
 import json
+import operator
 from zoneinfo import ZoneInfo
 
 
 class FirestoreManager:
+    # Firestore accepts at most 500 writes per batch commit
+    BATCH_LIMIT = 500
+    # Fields of a transaction document that make up one cart item
+    ITEM_FIELDS = ('name', 'price', 'quantity', 'subtotal')
+
     def __init__(self, credentials_path="firebase-credentials.json"):
         self.credentials_path = credentials_path
         self.db = None
+        # doc_id -> created_at of settings documents already read, saves a get() per save
+        self._settings_created_at = {}
         self.initialize_firestore()
     
     @staticmethod
@@ -90,11 +99,12 @@ class FirestoreManager:
             return None
 
         try:
+            name_lower = name.lower()
             product_id = str(uuid.uuid4())
             product_ref = self.db.collection('products').document(product_id)
 
             product_data = {
-                'name': name.lower(),
+                'name': name_lower,
                 'price': price,
                 'created_at': firestore.SERVER_TIMESTAMP,
                 'updated_at': firestore.SERVER_TIMESTAMP
@@ -102,13 +112,11 @@ class FirestoreManager:
 
             product_ref.set(product_data)
 
-            product_doc = product_ref.get()
-            product_data = product_doc.to_dict()
-
+            # name and price are stored exactly as written, no need to read the document back
             return {
                 'id': product_id,
-                'name': product_data['name'],
-                'price': product_data['price']
+                'name': name_lower,
+                'price': price
             }
         except Exception as e:
             print(f"Error adding product to Firestore: {e}")
@@ -119,8 +127,9 @@ class FirestoreManager:
             return None
 
         try:
+            name_lower = name.lower()
             products_ref = self.db.collection('products')
-            query = products_ref.where('name', '==', name.lower())
+            query = products_ref.where('name', '==', name_lower)
             docs = query.stream()
 
             updated = False
@@ -139,7 +148,7 @@ class FirestoreManager:
             if updated:
                 return {
                     'id': product_id,
-                    'name': name.lower(),
+                    'name': name_lower,
                     'price': price
                 }
             else:
@@ -154,8 +163,9 @@ class FirestoreManager:
             return None
 
         try:
+            name_lower = name.lower()
             products_ref = self.db.collection('products')
-            query = products_ref.where('name', '==', name.lower())
+            query = products_ref.where('name', '==', name_lower)
             docs = query.stream()
 
             deleted = False
@@ -170,7 +180,7 @@ class FirestoreManager:
             if deleted:
                 return {
                     'id': product_id,
-                    'name': name.lower()
+                    'name': name_lower
                 }
             else:
                 print(f"Product {name} not found in Firestore")
@@ -179,19 +189,30 @@ class FirestoreManager:
             print(f"Error deleting product from Firestore: {e}")
             return None
 
+    def _delete_collection(self, collection_name):
+        """Delete every document in a collection, BATCH_LIMIT deletes per round trip"""
+        batch = self.db.batch()
+        pending = 0
+        deleted_count = 0
+        for doc in self.db.collection(collection_name).stream():
+            batch.delete(doc.reference)
+            pending += 1
+            if pending == self.BATCH_LIMIT:
+                batch.commit()
+                deleted_count += pending
+                batch = self.db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+            deleted_count += pending
+        return deleted_count
+
     def delete_all_products(self):
         if not self.is_connected():
             return {'deleted_count': 0}
 
         try:
-            products_ref = self.db.collection('products')
-            docs = products_ref.stream()
-            
-            deleted_count = 0
-            for doc in docs:
-                doc.reference.delete()
-                deleted_count += 1
-            
+            deleted_count = self._delete_collection('products')
             return {'deleted_count': deleted_count}
         except Exception as e:
             print(f"Error deleting all products from Firestore: {e}")
@@ -202,8 +223,11 @@ class FirestoreManager:
             return None
 
         try:
-            # Create separate transaction documents for each item
+            # Create separate transaction documents for each item, written in one batch per cart
             transaction_ids = []
+            # One id shared by every item of this cart, used to group the items back together
+            group_id = str(uuid.uuid4())
+            batch = self.db.batch()
             
             for product_name, details in cart.items():
                 transaction_id = str(uuid.uuid4())
@@ -215,15 +239,19 @@ class FirestoreManager:
                     'quantity': details['quantity'],
                     'subtotal': details['price'] * details['quantity'],
                     'total': total,
+                    'group_id': group_id,
                     'timestamp': firestore.SERVER_TIMESTAMP
                 }
                 
-                transaction_ref.set(transaction_data)
+                batch.set(transaction_ref, transaction_data)
                 transaction_ids.append(transaction_id)
             
+            batch.commit()
+            
             # Return the list of created transaction IDs
             return {
                 'transaction_ids': transaction_ids,
+                'group_id': group_id,
                 'total': total,
                 'timestamp': self.get_wib_time()
             }
@@ -231,6 +259,42 @@ class FirestoreManager:
             print(f"Error saving transaction to Firestore: {e}")
             return None
 
+    @staticmethod
+    def _group_transactions(docs, limit=None):
+        """Rebuild cart transactions from per-item documents, newest first (at most limit of them)"""
+        grouped_transactions = {}
+        
+        for doc in docs:
+            data = doc.to_dict()
+            timestamp = data.get('timestamp')
+            total = data.get('total', 0)
+            
+            if timestamp:
+                # Carts saved before group_id existed fall back to their shared timestamp and total
+                key = data.get('group_id') or (timestamp, total)
+                transaction = grouped_transactions.get(key)
+                if transaction is None:
+                    transaction = grouped_transactions[key] = {
+                        'id': doc.id,  # Use first doc id as transaction id
+                        'items': [],
+                        'total': total,
+                        'timestamp': timestamp
+                    }
+                
+                # Add item to the transaction
+                transaction['items'].append({
+                    'name': data.get('name', ''),
+                    'price': data.get('price', 0),
+                    'quantity': data.get('quantity', 0),
+                    'subtotal': data.get('subtotal', 0)
+                })
+        
+        # Only carts with a timestamp are grouped, so it can be the sort key directly
+        by_timestamp = operator.itemgetter('timestamp')
+        if limit is not None:
+            return heapq.nlargest(limit, grouped_transactions.values(), key=by_timestamp)
+        return sorted(grouped_transactions.values(), key=by_timestamp, reverse=True)
+
     def get_transactions(self, limit=20):
         if not self.is_connected():
             return []
@@ -240,39 +304,7 @@ class FirestoreManager:
             query = transactions_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
             docs = query.stream()
 
-            # Group transactions by timestamp and total to reconstruct cart transactions
-            grouped_transactions = {}
-            
-            for doc in docs:
-                data = doc.to_dict()
-                timestamp = data.get('timestamp')
-                total = data.get('total', 0)
-                
-                # Create a key from timestamp and total to group items
-                if timestamp:
-                    key = f"{timestamp}_{total}"
-                    
-                    if key not in grouped_transactions:
-                        grouped_transactions[key] = {
-                            'id': doc.id,  # Use first doc id as transaction id
-                            'items': [],
-                            'total': total,
-                            'timestamp': timestamp
-                        }
-                    
-                    # Add item to the transaction
-                    grouped_transactions[key]['items'].append({
-                        'name': data.get('name', ''),
-                        'price': data.get('price', 0),
-                        'quantity': data.get('quantity', 0),
-                        'subtotal': data.get('subtotal', 0)
-                    })
-            
-            # Convert to list and sort by timestamp
-            transactions = list(grouped_transactions.values())
-            transactions.sort(key=lambda x: x['timestamp'] if x['timestamp'] else datetime.datetime.min, reverse=True)
-            
-            return transactions[:limit]
+            return self._group_transactions(docs, limit)
         except Exception as e:
             print(f"Error retrieving transactions from Firestore: {e}")
             return []
@@ -294,36 +326,7 @@ class FirestoreManager:
             query = transactions_ref.where('timestamp', '>=', start_date).where('timestamp', '<', end_date)
             docs = query.stream()
 
-            # Group transactions by timestamp and total
-            grouped_transactions = {}
-            
-            for doc in docs:
-                data = doc.to_dict()
-                timestamp = data.get('timestamp')
-                total = data.get('total', 0)
-                
-                if timestamp:
-                    key = f"{timestamp}_{total}"
-                    
-                    if key not in grouped_transactions:
-                        grouped_transactions[key] = {
-                            'id': doc.id,
-                            'items': [],
-                            'total': total,
-                            'timestamp': timestamp
-                        }
-                    
-                    grouped_transactions[key]['items'].append({
-                        'name': data.get('name', ''),
-                        'price': data.get('price', 0),
-                        'quantity': data.get('quantity', 0),
-                        'subtotal': data.get('subtotal', 0)
-                    })
-            
-            transactions = list(grouped_transactions.values())
-            transactions.sort(key=lambda x: x['timestamp'] if x['timestamp'] else datetime.datetime.min, reverse=True)
-            
-            return transactions
+            return self._group_transactions(docs)
         except Exception as e:
             print(f"Error retrieving transactions by date range from Firestore: {e}")
             return []
@@ -351,14 +354,7 @@ class FirestoreManager:
             return {'deleted_count': 0}
 
         try:
-            transactions_ref = self.db.collection('transactions')
-            docs = transactions_ref.stream()
-            
-            deleted_count = 0
-            for doc in docs:
-                doc.reference.delete()
-                deleted_count += 1
-            
+            deleted_count = self._delete_collection('transactions')
             return {'deleted_count': deleted_count}
         except Exception as e:
             print(f"Error deleting all transactions from Firestore: {e}")
@@ -373,20 +369,23 @@ class FirestoreManager:
             settings_ref = self.db.collection('settings').document(doc_id)
             
             # Add timestamp for tracking
-            settings_data = {
-                **settings,
-                'updated_at': self.get_wib_time(),
-                'created_at': self.get_wib_time()
-            }
+            now = self.get_wib_time()
+            settings_data = dict(settings)
+            settings_data['updated_at'] = now
             
-            # Check if document exists to update created_at properly
-            existing_doc = settings_ref.get()
-            if existing_doc.exists:
-                existing_data = existing_doc.to_dict()
-                if 'created_at' in existing_data:
-                    settings_data['created_at'] = existing_data['created_at']
+            # Keep the original created_at; only the first save of a document has to look it up
+            created_at = self._settings_created_at.get(doc_id)
+            if created_at is None:
+                created_at = now
+                existing_doc = settings_ref.get()
+                if existing_doc.exists:
+                    existing_data = existing_doc.to_dict()
+                    if 'created_at' in existing_data:
+                        created_at = existing_data['created_at']
+            settings_data['created_at'] = created_at
             
             settings_ref.set(settings_data)
+            self._settings_created_at[doc_id] = created_at
             return True
             
         except Exception as e:
@@ -437,20 +436,22 @@ class FirestoreManager:
             timestamp = data.get('timestamp')
             total = data.get('total', 0)
             
-            # Find all items with the same timestamp and total
+            # Find all items of the same cart
             transactions_ref = self.db.collection('transactions')
-            query = transactions_ref.where('timestamp', '==', timestamp).where('total', '==', total)
-            docs = query.stream()
+            group_id = data.get('group_id')
+            if group_id:
+                query = transactions_ref.where('group_id', '==', group_id)
+            else:
+                query = transactions_ref.where('timestamp', '==', timestamp).where('total', '==', total)
+            # Only the item fields are fetched, the cart fields are already known from the first doc
+            docs = query.select(self.ITEM_FIELDS).stream()
             
-            items = []
-            for doc in docs:
-                item_data = doc.to_dict()
-                items.append({
-                    'name': item_data.get('name', ''),
-                    'price': item_data.get('price', 0),
-                    'quantity': item_data.get('quantity', 0),
-                    'subtotal': item_data.get('subtotal', 0)
-                })
+            items = [{
+                'name': item_data.get('name', ''),
+                'price': item_data.get('price', 0),
+                'quantity': item_data.get('quantity', 0),
+                'subtotal': item_data.get('subtotal', 0)
+            } for item_data in (doc.to_dict() for doc in docs)]
             
             return {
                 'id': transaction_id,
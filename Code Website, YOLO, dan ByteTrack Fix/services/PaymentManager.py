@@ -12,13 +12,19 @@ Handles:
 
 import os
 import json
+import collections
 import hashlib
 import hmac
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 import midtransclient
 import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -34,6 +40,19 @@ class PaymentManager:
     Supports sandbox/production toggle via environment variables
     """
     
+    # Shared instance handed out by get_payment_manager()
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    # Upper bound on concurrent status requests, kept within the session's connection pool
+    STATUS_CHECK_WORKERS = 8
+    
+    # Status cache: polling within STATUS_CACHE_TTL seconds reuses the last answer,
+    # final statuses never change so they stay cached (LRU, STATUS_CACHE_SIZE orders)
+    STATUS_CACHE_TTL = 2.0
+    STATUS_CACHE_SIZE = 4096
+    TERMINAL_STATUSES = frozenset(('settlement', 'expire', 'deny', 'cancel', 'failure'))
+    
     def __init__(self):
         """Initialize PaymentManager dengan Midtrans configuration"""
         self.environment = os.getenv('MIDTRANS_ENVIRONMENT', 'sandbox')
@@ -56,9 +75,32 @@ class PaymentManager:
         self.error_url = os.getenv('PAYMENT_ERROR_URL')
         self.pending_url = os.getenv('PAYMENT_PENDING_URL')
         
+        # order_id -> (expires_at, status result), see check_payment_status
+        self._status_cache = collections.OrderedDict()
+        self._status_cache_lock = threading.Lock()
+        
+        # Enabled payment methods: fixed for the life of the process, built once
+        self._enabled_payments = (
+            # All Virtual Account (VA) methods
+            'bca_va',        # BCA Virtual Account
+            'bni_va',        # BNI Virtual Account  
+            'bri_va',        # BRI Virtual Account
+            'permata_va',    # Permata Virtual Account
+            'cimb_va',       # CIMB Virtual Account
+            'danamon_va',    # Danamon Virtual Account
+            'echannel',      # Mandiri Bill Payment
+            'other_va',      # Other Virtual Account
+            
+            # QRIS & E-Wallet methods (comprehensive list)
+            'gopay',         # GoPay direct payment (app redirect/QR code)
+            'qris',          # Standard QRIS (GoPay QRIS, ShopeePay QRIS, DANA, OVO, LinkAja)
+            'other_qris'     # Other QRIS providers (generic QRIS)
+        )
+        
         # Validate required configuration
         if not self.server_key or not self.client_key:
             raise ValueError(f"Missing Midtrans API keys for {self.environment} environment")
+        self._server_key_bytes = self.server_key.encode('utf-8')
         
         # Initialize Midtrans Snap client
         try:
@@ -67,11 +109,32 @@ class PaymentManager:
                 server_key=self.server_key,
                 client_key=self.client_key
             )
+            # The SDK calls the bare requests module (new connection + TLS handshake per call);
+            # give it a pooled keep-alive session instead
+            self.http_session = self._create_http_session()
+            sdk_http_client = getattr(self.snap, 'http_client', None)
+            if sdk_http_client is not None and hasattr(sdk_http_client, 'http_client'):
+                sdk_http_client.http_client = self.http_session
             logger.info(f"PaymentManager initialized for {self.environment} environment")
         except Exception as e:
             logger.error(f"Failed to initialize Midtrans client: {str(e)}")
             raise
     
+    @staticmethod
+    def _create_http_session() -> requests.Session:
+        """
+        Create the keep-alive session used for all Midtrans API calls
+        
+        Returns:
+            requests.Session with a connection pool mounted for https://
+        """
+        session = requests.Session()
+        # Retry only covers idempotent methods by default, so a charge (POST) is never sent twice
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32,
+                              max_retries=Retry(total=2, backoff_factor=0.2))
+        session.mount('https://', adapter)
+        return session
+    
     def generate_order_id(self, transaction_id: str = None) -> str:
         """
         Generate unique order ID untuk Midtrans
@@ -146,7 +209,7 @@ class PaymentManager:
                     'duration': self.timeout_minutes,
                     'unit': 'minutes'
                 },
-                'enabled_payments': self.get_enabled_payment_methods(),
+                'enabled_payments': self._enabled_payments,  # tuple, serialized as a JSON array
                 'custom_field1': transaction_data.get('transaction_id', ''),
                 'custom_field2': 'self_checkout_system',
                 'custom_field3': self.environment
@@ -182,21 +245,53 @@ class PaymentManager:
                 'error_type': 'payment_creation_failed'
             }
     
-    def check_payment_status(self, order_id: str) -> Dict[str, Any]:
+    def check_payment_status(self, order_id: str, use_cache: bool = True,
+                             include_raw: bool = False) -> Dict[str, Any]:
         """
         Check payment status dari Midtrans
         
         Args:
             order_id: Midtrans order ID
+            use_cache: Reuse a recent (or final) status instead of asking Midtrans again
+            include_raw: Also return the full Midtrans response as 'raw_response'
+                (always asks Midtrans, the cache does not keep raw responses)
             
         Returns:
             Dict dengan payment status information
         """
+        now = time.monotonic()
+        if use_cache and not include_raw:
+            with self._status_cache_lock:
+                cached = self._status_cache.get(order_id)
+                if cached is not None and cached[0] > now:
+                    self._status_cache.move_to_end(order_id)
+                    return dict(cached[1])
+        
+        result = self._fetch_payment_status(order_id, include_raw)
+        if result['success']:
+            cached = dict(result)
+            cached.pop('raw_response', None)
+            final = result['transaction_status'] in self.TERMINAL_STATUSES
+            expires_at = float('inf') if final else now + self.STATUS_CACHE_TTL
+            with self._status_cache_lock:
+                self._status_cache[order_id] = (expires_at, cached)
+                self._status_cache.move_to_end(order_id)
+                while len(self._status_cache) > self.STATUS_CACHE_SIZE:
+                    self._status_cache.popitem(last=False)
+        return result
+    
+    def _invalidate_payment_status(self, order_id: str):
+        """Drop the cached status of an order whose status just changed"""
+        with self._status_cache_lock:
+            self._status_cache.pop(order_id, None)
+    
+    def _fetch_payment_status(self, order_id: str, include_raw: bool = False) -> Dict[str, Any]:
+        """Ask Midtrans for the current status of an order (uncached)"""
         try:
             # Get transaction status dari Midtrans
             status_response = self.snap.transactions.status(order_id)
             
-            return {
+            result = {
                 'success': True,
                 'order_id': order_id,
                 'transaction_id': status_response.get('transaction_id'),
@@ -208,8 +303,10 @@ class PaymentManager:
                 'transaction_time': status_response.get('transaction_time'),
                 'settlement_time': status_response.get('settlement_time', ''),
                 'status_message': status_response.get('status_message', ''),
-                'raw_response': status_response
             }
+            if include_raw:
+                result['raw_response'] = status_response
+            return result
             
         except Exception as e:
             logger.error(f"Error checking payment status for {order_id}: {str(e)}")
@@ -220,6 +317,24 @@ class PaymentManager:
                 'error_type': 'status_check_failed'
             }
     
+    def check_payment_statuses(self, order_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Check payment status of several orders concurrently
+        
+        Args:
+            order_ids: Midtrans order IDs
+            
+        Returns:
+            List of check_payment_status results, in the same order as order_ids
+        """
+        order_ids = list(order_ids)
+        if len(order_ids) <= 1:
+            return [self.check_payment_status(order_id) for order_id in order_ids]
+        
+        # The calls are network-bound and release the GIL while waiting; they share self.http_session
+        with ThreadPoolExecutor(max_workers=min(len(order_ids), self.STATUS_CHECK_WORKERS)) as executor:
+            return list(executor.map(self.check_payment_status, order_ids))
+    
     def verify_webhook_signature(self, notification_body: str, signature_key: str) -> bool:
         """
         Verify Midtrans webhook notification signature
@@ -240,13 +355,19 @@ class PaymentManager:
             status_code = notification_data.get('status_code', '')
             gross_amount = notification_data.get('gross_amount', '')
             
-            signature_string = f"{order_id}{status_code}{gross_amount}{self.server_key}"
+            signature_bytes = f"{order_id}{status_code}{gross_amount}".encode('utf-8') + self._server_key_bytes
             
-            # Calculate expected signature
-            calculated_signature = hashlib.sha512(signature_string.encode('utf-8')).hexdigest()
+            # Calculate expected signature (raw digest, no hex encoding needed)
+            calculated_signature = hashlib.sha512(signature_bytes).digest()
             
-            # Compare signatures
-            is_valid = hmac.compare_digest(calculated_signature, signature_key)
+            # Compare signatures as bytes; anything but 128 hex characters can never match
+            received_signature = b''
+            if isinstance(signature_key, str) and len(signature_key) == 128:
+                try:
+                    received_signature = bytes.fromhex(signature_key)
+                except ValueError:
+                    pass
+            is_valid = hmac.compare_digest(calculated_signature, received_signature)
             
             if not is_valid:
                 logger.warning(f"Invalid webhook signature for order_id: {order_id}")
@@ -257,12 +378,14 @@ class PaymentManager:
             logger.error(f"Error verifying webhook signature: {str(e)}")
             return False
     
-    def process_webhook_notification(self, notification_data: Dict[str, Any]) -> Dict[str, Any]:
+    def process_webhook_notification(self, notification_data: Dict[str, Any],
+                                     include_raw: bool = False) -> Dict[str, Any]:
         """
         Process webhook notification dari Midtrans
         
         Args:
             notification_data: Notification payload dari Midtrans
+            include_raw: Also return the payload itself as 'raw_notification'
             
         Returns:
             Dict dengan processed notification information
@@ -274,6 +397,7 @@ class PaymentManager:
             fraud_status = notification_data.get('fraud_status', 'accept')
             
             logger.info(f"Processing webhook for order_id: {order_id}, status: {transaction_status}")
+            self._invalidate_payment_status(order_id)
             
             # Determine payment result
             payment_successful = (
@@ -302,33 +426,37 @@ class PaymentManager:
                 'status_message': notification_data.get('status_message', ''),
                 'custom_field1': notification_data.get('custom_field1', ''),  # Original transaction_id
                 'webhook_timestamp': datetime.now().isoformat(),
-                'raw_notification': notification_data
             }
+            if include_raw:
+                processed_notification['raw_notification'] = notification_data
             
             return processed_notification
             
         except Exception as e:
             logger.error(f"Error processing webhook notification: {str(e)}")
-            return {
+            error_result = {
                 'success': False,
                 'error': str(e),
-                'error_type': 'webhook_processing_failed',
-                'raw_notification': notification_data
+                'error_type': 'webhook_processing_failed'
             }
+            if include_raw:
+                error_result['raw_notification'] = notification_data
+            return error_result
     
-    def cancel_payment(self, order_id: str) -> Dict[str, Any]:
+    def cancel_payment(self, order_id: str, include_raw: bool = False) -> Dict[str, Any]:
         """
         Cancel payment di Midtrans (jika masih pending)
         
         Args:
             order_id: Midtrans order ID
+            include_raw: Also return the full Midtrans response as 'raw_response'
             
         Returns:
             Dict dengan cancellation result
         """
         try:
-            # Check current status first
-            current_status = self.check_payment_status(order_id)
+            # Check current status first (fresh, a cached one may be up to STATUS_CACHE_TTL old)
+            current_status = self.check_payment_status(order_id, use_cache=False)
             
             if not current_status['success']:
                 return current_status
@@ -343,16 +471,19 @@ class PaymentManager:
             
             # Attempt to cancel
             cancel_response = self.snap.transactions.cancel(order_id)
+            self._invalidate_payment_status(order_id)
             
             logger.info(f"Payment cancelled for order_id: {order_id}")
             
-            return {
+            result = {
                 'success': True,
                 'order_id': order_id,
                 'status': 'cancelled',
-                'message': 'Payment cancelled successfully',
-                'raw_response': cancel_response
+                'message': 'Payment cancelled successfully'
             }
+            if include_raw:
+                result['raw_response'] = cancel_response
+            return result
             
         except Exception as e:
             logger.error(f"Error cancelling payment for {order_id}: {str(e)}")
@@ -374,23 +505,9 @@ class PaymentManager:
         
         Returns:
             List of payment method codes for enabled_payments parameter
+            (a fresh copy of self._enabled_payments, safe to modify)
         """
-        return [
-            # All Virtual Account (VA) methods
-            'bca_va',        # BCA Virtual Account
-            'bni_va',        # BNI Virtual Account  
-            'bri_va',        # BRI Virtual Account
-            'permata_va',    # Permata Virtual Account
-            'cimb_va',       # CIMB Virtual Account
-            'danamon_va',    # Danamon Virtual Account
-            'echannel',      # Mandiri Bill Payment
-            'other_va',      # Other Virtual Account
-            
-            # QRIS & E-Wallet methods (comprehensive list)
-            'gopay',         # GoPay direct payment (app redirect/QR code)
-            'qris',          # Standard QRIS (GoPay QRIS, ShopeePay QRIS, DANA, OVO, LinkAja)
-            'other_qris'     # Other QRIS providers (generic QRIS)
-        ]
+        return list(self._enabled_payments)
     
     def get_environment_info(self) -> Dict[str, Any]:
         """
@@ -413,6 +530,19 @@ class PaymentManager:
             'enabled_payment_methods': self.get_enabled_payment_methods()
         }
 
+def get_payment_manager() -> PaymentManager:
+    """
+    Get the process-wide PaymentManager, creating it on first use
+    
+    Returns:
+        Shared PaymentManager instance (one Snap client and HTTP session)
+    """
+    if PaymentManager._instance is None:
+        with PaymentManager._instance_lock:
+            if PaymentManager._instance is None:
+                PaymentManager._instance = PaymentManager()
+    return PaymentManager._instance
+
 # Example usage dan testing
 if __name__ == "__main__":
     try:
@@ -1,7 +1,7 @@
 import cv2
+import itertools
 import torch
 import numpy as np
-from PIL import Image
 import time
 import threading
 import os
@@ -10,106 +10,219 @@ import sys
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 
+# Input sizes only change with processingSpeed, let cuDNN pick and cache the fastest kernels
+torch.backends.cudnn.benchmark = True
+
+_MISSING = object()
+
+# Cart versions are unique across detectors, so a version seen before a model change never repeats
+_cart_versions = itertools.count(1)
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # numba is optional, _assign_tracks falls back to NumPy
+
+
+def _assign_tracks_numpy(det_boxes, det_labels, trk_boxes, trk_labels, iou_thresh):
+    # Index of the best same-label track per detection (first one on ties), -1 if none beats iou_thresh
+    x1 = np.maximum(det_boxes[:, None, 0], trk_boxes[None, :, 0])
+    y1 = np.maximum(det_boxes[:, None, 1], trk_boxes[None, :, 1])
+    x2 = np.minimum(det_boxes[:, None, 2], trk_boxes[None, :, 2])
+    y2 = np.minimum(det_boxes[:, None, 3], trk_boxes[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    det_area = (det_boxes[:, 2] - det_boxes[:, 0]) * (det_boxes[:, 3] - det_boxes[:, 1])
+    trk_area = (trk_boxes[:, 2] - trk_boxes[:, 0]) * (trk_boxes[:, 3] - trk_boxes[:, 1])
+    union = det_area[:, None] + trk_area[None, :] - intersection
+    iou = np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+    iou[det_labels[:, None] != trk_labels[None, :]] = -1.0
+
+    best = iou.argmax(axis=1)
+    best_iou = iou[np.arange(len(det_boxes)), best]
+    return np.where(best_iou > iou_thresh, best, -1).astype(np.int64)
+
+
+if njit is not None:
+    # Explicit signature: compiled (and cached to disk) at import, not on the first frame
+    @njit('int64[:](float32[:, :], int32[:], float32[:, :], int32[:], float64)', cache=True, fastmath=True)
+    def _assign_tracks(det_boxes, det_labels, trk_boxes, trk_labels, iou_thresh):
+        out = np.full(det_boxes.shape[0], -1, dtype=np.int64)
+        for i in range(det_boxes.shape[0]):
+            best_iou = iou_thresh
+            for j in range(trk_boxes.shape[0]):
+                if det_labels[i] != trk_labels[j]:
+                    continue
+                iw = min(det_boxes[i, 2], trk_boxes[j, 2]) - max(det_boxes[i, 0], trk_boxes[j, 0])
+                ih = min(det_boxes[i, 3], trk_boxes[j, 3]) - max(det_boxes[i, 1], trk_boxes[j, 1])
+                if iw <= 0 or ih <= 0:
+                    continue
+                intersection = iw * ih
+                union = ((det_boxes[i, 2] - det_boxes[i, 0]) * (det_boxes[i, 3] - det_boxes[i, 1])
+                         + (trk_boxes[j, 2] - trk_boxes[j, 0]) * (trk_boxes[j, 3] - trk_boxes[j, 1])
+                         - intersection)
+                if union > 0 and intersection / union > best_iou:
+                    best_iou = intersection / union
+                    out[i] = j
+        return out
+else:
+    _assign_tracks = _assign_tracks_numpy
+
 # Simple ByteTracker implementation
 class SimpleTracker:
     def __init__(self, max_age=30, min_confidence=0.5):
-        self.tracks = {}
+        # Tracks as parallel arrays (one slot per track, the first _n slots are live) so matching
+        # reads contiguous buffers; slots are overwritten in place and compacted after aging
+        self._cap = 64
+        self._n = 0
+        self._ids = np.zeros(self._cap, dtype=np.int64)
+        self._boxes = np.zeros((self._cap, 4), dtype=np.float32)
+        self._labels = np.zeros(self._cap, dtype=np.int32)
+        self._ages = np.zeros(self._cap, dtype=np.int32)
+        self._last_seen = np.zeros(self._cap, dtype=np.float64)
+        # label -> int code stored in _labels, kept for the tracker's lifetime
+        self._label_codes = {}
         self.next_id = 1
         self.max_age = max_age
         self.min_confidence = min_confidence
         
+    IOU_THRESHOLD = 0.3  # Minimum IoU for a detection to continue a track
+
     def update(self, detections):
         # Simple tracking based on IoU and position
         tracked_objects = []
         current_time = time.time()
+        codes = self._label_codes
+        det_labels = [codes.setdefault(det['label'], len(codes)) for det in detections]
+        matches = self._match_existing(detections, det_labels)
+        new_tracks = []  # (slot, label code, box) of tracks opened in this frame
         
-        for det in detections:
-            best_match = None
-            best_iou = 0.3  # Minimum IoU threshold
-            
-            # Find best matching track
-            for track_id, track_data in self.tracks.items():
-                if track_data['label'] == det['label']:
-                    iou = self._calculate_iou(det['box'], track_data['box'])
-                    if iou > best_iou:
-                        best_iou = iou
-                        best_match = track_id
+        for det, code, best_match in zip(detections, det_labels, matches):
+            if best_match < 0:
+                # Tracks opened earlier in this frame are not in the batch, check those few directly
+                best_iou = self.IOU_THRESHOLD
+                for slot, track_code, track_box in new_tracks:
+                    if track_code == code:
+                        iou = self._calculate_iou(det['box'], track_box)
+                        if iou > best_iou:
+                            best_iou = iou
+                            best_match = slot
             
-            if best_match:
+            if best_match >= 0:
                 # Update existing track
-                self.tracks[best_match].update({
-                    'box': det['box'],
-                    'center': det['center'],
-                    'confidence': det['confidence'],
-                    'last_seen': current_time,
-                    'age': 0
-                })
-                track_id = best_match
+                slot = best_match
+                self._boxes[slot] = det['box']
             else:
                 # Create new track
-                track_id = self.next_id
+                if self._n == self._cap:
+                    self._grow()
+                slot = self._n
+                self._n += 1
+                self._ids[slot] = self.next_id
                 self.next_id += 1
-                self.tracks[track_id] = {
-                    'label': det['label'],
-                    'box': det['box'],
-                    'center': det['center'],
-                    'confidence': det['confidence'],
-                    'last_seen': current_time,
-                    'age': 0
-                }
+                self._boxes[slot] = det['box']
+                self._labels[slot] = code
+                new_tracks.append((slot, code, det['box']))
+            self._ages[slot] = 0
+            self._last_seen[slot] = current_time
             
             # Add track_id to detection
-            det['track_id'] = track_id
+            det['track_id'] = int(self._ids[slot])
             tracked_objects.append(det)
         
         # Age and remove old tracks
-        to_remove = []
-        for track_id, track_data in self.tracks.items():
-            track_data['age'] += 1
-            if track_data['age'] > self.max_age:
-                to_remove.append(track_id)
-        
-        for track_id in to_remove:
-            del self.tracks[track_id]
+        n = self._n
+        self._ages[:n] += 1
+        keep = self._ages[:n] <= self.max_age
+        if not keep.all():
+            kept = int(keep.sum())
+            for arr in (self._ids, self._boxes, self._labels, self._ages, self._last_seen):
+                arr[:kept] = arr[:n][keep]
+            self._n = kept
         
         return tracked_objects
     
+    def _grow(self):
+        self._cap *= 2
+        self._ids = np.resize(self._ids, self._cap)
+        self._boxes = np.resize(self._boxes, (self._cap, 4))
+        self._labels = np.resize(self._labels, self._cap)
+        self._ages = np.resize(self._ages, self._cap)
+        self._last_seen = np.resize(self._last_seen, self._cap)
+    
+    def _match_existing(self, detections, det_labels):
+        # Slot of the best same-label track (by IoU) for every detection against the tracks from
+        # previous frames, in one _assign_tracks call; -1 when nothing passes
+        n = self._n
+        if not detections or not n:
+            return [-1] * len(detections)
+        det_boxes = np.ascontiguousarray([det['box'] for det in detections], dtype=np.float32)
+        best = _assign_tracks(det_boxes, np.asarray(det_labels, dtype=np.int32),
+                              self._boxes[:n], self._labels[:n], float(self.IOU_THRESHOLD))
+        return best.tolist()
+    
     def _calculate_iou(self, box1, box2):
         x1_1, y1_1, x2_1, y2_1 = box1
         x1_2, y1_2, x2_2, y2_2 = box2
         
-        x1_i = max(x1_1, x1_2)
-        y1_i = max(y1_1, y1_2)
-        x2_i = min(x2_1, x2_2)
-        y2_i = min(y2_1, y2_2)
-        
-        if x2_i <= x1_i or y2_i <= y1_i:
-            return 0.0
-        
-        intersection = (x2_i - x1_i) * (y2_i - y1_i)
+        # Straight-line: a negative overlap clamps to 0 and the epsilon stands in for a union > 0 check
+        intersection = (max(0.0, min(x2_1, x2_2) - max(x1_1, x1_2))
+                        * max(0.0, min(y2_1, y2_2) - max(y1_1, y1_2)))
         area1 = (x2_1 - x1_1) * (y2_1 - y1_1)
         area2 = (x2_2 - x1_2) * (y2_2 - y1_2)
-        union = area1 + area2 - intersection
         
-        return intersection / union if union > 0 else 0.0
+        return intersection / (area1 + area2 - intersection + 1e-9)
 
 
 class ProductDetector:
+    # Config key -> setter used by apply_settings
+    SETTING_SETTERS = {
+        'threshold': 'set_detection_threshold',
+        'autoCount': 'set_auto_count',
+        'showBoxes': 'set_show_boxes',
+        'showLabels': 'set_show_labels',
+        'showConfidence': 'set_show_confidence',
+        'showOverlays': 'set_show_overlays',
+        'showAllDetections': 'set_show_all_detections',
+        'zoneColor': 'set_zone_color',
+        'boxColor': 'set_box_color',
+        'zoneOpacity': 'set_zone_opacity',
+        'resolution': 'set_resolution',
+        'frameRate': 'set_frame_rate',
+        'processingSpeed': 'set_processing_speed',
+        'model': 'set_model',
+    }
+
+    # Info overlay lines, drawn as prefix (cached sprite) + per-frame value
+    OVERLAY_PREFIXES = ("FPS: ", "Products: ", "Model: ", "Threshold: ", "Processing: ", "Mode: ", "Zone: ")
+
     def __init__(self, model_path, camera_id=0):
+        self.set_thread_budget()
         self.model_path = model_path
         self.camera_id = camera_id
         self.model = None
         self.is_running = False
         self.detection_thread = None
         self.cart = {}
+        self._cart_version = 0
         self.frame = None
         self.product_catalog = {}  # Will be updated by DetectorManager
+        # (class names, bool per class id: is it a catalog product), see _get_catalog_class_mask
+        self._catalog_class_mask = None
         self.frame_width = 0
         self.frame_height = 0
         self.counted_objects = {}
         self.counting_zone_start_percent = 70
         self.counting_zone_width_percent = 20
+        # (start %, width %, frame width) -> zone pixels, see _get_zone_pixels
+        self._zone_pixels_key = None
+        self._zone_pixels = None
         self.tracker = SimpleTracker()  # Add simple tracker
+        # 'fp16' halves the weights on CUDA (CPU stays FP32), 'fp32' keeps full precision
+        self.precision = os.getenv('YOLO_PRECISION', 'fp16').lower()
+        # 'onnx' runs inference through ONNX Runtime instead of eager PyTorch (needs onnxruntime)
+        self.runtime = os.getenv('YOLO_RUNTIME', 'torch').lower()
+        # YOLO_COMPILE=1 specializes the PyTorch forward with torch.compile (torch 2.x)
+        self.compile_model = os.getenv('YOLO_COMPILE', '0') == '1'
         self.load_model()
         self.stop_flag = threading.Event()
 
@@ -123,6 +236,7 @@ class ProductDetector:
         self.zone_color = (0, 0, 255)
         self.box_color = (0, 255, 0)
         self.zone_opacity = 0.2
+        self._update_zone_blend()
         self.target_resolution = (640, 480)
         self.target_fps = 30
         self.processing_speed = 'balanced'
@@ -135,6 +249,13 @@ class ProductDetector:
         self.detection_count = 0
         self.last_detection_time = time.time()
         self.processing_time = 0
+        # zone_status -> pre-rendered overlay prefixes, see _get_overlay_chrome
+        self._overlay_chrome = {}
+
+        # Raw config values last passed through apply_settings
+        self._applied_settings = {}
+        # RGB copy of the current frame, reused while the frame shape stays the same
+        self._rgb_buf = None
 
 
     def load_model(self):
@@ -205,12 +326,84 @@ class ProductDetector:
             if not success:
                 raise Exception("All model loading strategies failed")
             
+            if self.runtime == 'onnx':
+                self._load_onnx_runtime()
+            self._apply_precision()
+            if self.compile_model:
+                self._compile_model()
+            
         except Exception as e:
             print(f"[ERROR] Failed to load model: {e}")
             import traceback
             traceback.print_exc()
             raise e
 
+    def unload_model(self):
+        # Drop the weights but keep the detector (cart, settings) usable; detect_objects finds
+        # nothing until load_model() runs again
+        self.model = None
+
+    def set_thread_budget(self, n_cv=None, n_torch=None):
+        # Split the cores between OpenCV (capture/resize/draw) and PyTorch's CPU forward pass
+        # instead of letting both pools claim every core; default is half each
+        half = max(1, (os.cpu_count() or 2) // 2)
+        cv2.setNumThreads(n_cv or half)
+        torch.set_num_threads(n_torch or half)
+
+    def _load_onnx_runtime(self):
+        # Export once next to the .pt (again when the .pt is newer), then let YOLOv5's own
+        # ONNX backend run it so AutoShape pre/post-processing and results stay the same
+        onnx_path = os.path.splitext(self.model_path)[0] + '.onnx'
+        try:
+            if (not os.path.exists(onnx_path)
+                    or os.path.getmtime(onnx_path) < os.path.getmtime(self.model_path)):
+                print(f"Exporting model to ONNX: {onnx_path}")
+                net = self.model.model.model  # AutoShape -> DetectMultiBackend -> DetectionModel
+                detect = net.model[-1]
+                orig_export, orig_dynamic = detect.export, detect.dynamic
+                detect.export, detect.dynamic = True, True  # plain outputs, grid rebuilt per input size
+                try:
+                    param = next(net.parameters())
+                    dummy = torch.zeros(1, 3, 640, 640, device=param.device, dtype=param.dtype)
+                    torch.onnx.export(net, dummy, onnx_path, opset_version=17,
+                                      input_names=['images'], output_names=['output0'],
+                                      dynamic_axes={'images': {0: 'batch', 2: 'height', 3: 'width'},
+                                                    'output0': {0: 'batch', 1: 'anchors'}})
+                finally:
+                    detect.export, detect.dynamic = orig_export, orig_dynamic
+            
+            onnx_model = torch.hub.load('ultralytics/yolov5', 'custom', path=onnx_path,
+                                        trust_repo=True, skip_validation=True)
+            # The exported graph carries no class names, keep the ones from the .pt
+            onnx_model.names = self.model.names
+            self.model = onnx_model
+            print("✅ Model running on ONNX Runtime")
+        except Exception as e:
+            print(f"⚠️ ONNX runtime unavailable, staying on PyTorch: {e}")
+
+    def _apply_precision(self):
+        # AutoShape casts its input to the weights' dtype, so halving the model is all FP16 needs
+        if self.precision != 'fp16' or not torch.cuda.is_available():
+            return
+        param = next(self.model.parameters(), None)
+        if param is not None and param.is_cuda:
+            self.model.half()
+            print("✅ Model converted to FP16")
+
+    def _compile_model(self):
+        # Compile only the network inside AutoShape (letterbox/NMS stay eager) with static shapes:
+        # the input size only changes with processingSpeed or the camera resolution, and each new
+        # shape just triggers one recompile
+        backend = getattr(self.model, 'model', None)
+        if not hasattr(torch, 'compile') or not getattr(backend, 'pt', False):
+            return
+        try:
+            mode = 'reduce-overhead' if torch.cuda.is_available() else None
+            backend.model = torch.compile(backend.model, mode=mode, dynamic=False)
+            print("✅ Model compiled with torch.compile")
+        except Exception as e:
+            print(f"⚠️ torch.compile unavailable, staying eager: {e}")
+
     def set_detection_threshold(self, threshold):
         self.detection_threshold = max(0.1, min(1.0, threshold))
 
@@ -238,6 +431,7 @@ class ProductDetector:
             self.zone_color = tuple(int(color[i:i+2], 16) for i in (4, 2, 0))
         elif isinstance(color, (list, tuple)) and len(color) == 3:
             self.zone_color = tuple(color)
+        self._update_zone_blend()
 
     def set_box_color(self, color):
         if isinstance(color, str):
@@ -248,6 +442,13 @@ class ProductDetector:
 
     def set_zone_opacity(self, opacity):
         self.zone_opacity = max(0.1, min(1.0, opacity))
+        self._update_zone_blend()
+
+    def _update_zone_blend(self):
+        # 3x4 cv2.transform matrix: pixel * (1 - opacity) + zone_color * opacity, in one pass
+        alpha = self.zone_opacity
+        self._zone_blend = np.hstack((np.eye(3) * (1 - alpha),
+                                      np.array(self.zone_color, dtype=np.float64).reshape(3, 1) * alpha)).astype(np.float32)
 
     def set_resolution(self, resolution):
         if isinstance(resolution, str):
@@ -281,39 +482,29 @@ class ProductDetector:
             'modelType': self.model_type
         }
 
+    def apply_settings(self, settings):
+        """Apply config values in one call, running setters only for values that changed"""
+        changed = []
+        for key, value in settings.items():
+            setter = self.SETTING_SETTERS.get(key)
+            if setter is None or self._applied_settings.get(key, _MISSING) == value:
+                continue
+            getattr(self, setter)(value)
+            self._applied_settings[key] = value
+            changed.append(key)
+        return changed
+
     def apply_visual_config(self, config):
-        if 'showBoxes' in config:
-            self.set_show_boxes(config['showBoxes'])
-        if 'showLabels' in config:
-            self.set_show_labels(config['showLabels'])
-        if 'showConfidence' in config:
-            self.set_show_confidence(config['showConfidence'])
-        if 'showOverlays' in config:
-            self.set_show_overlays(config['showOverlays'])
-        if 'showAllDetections' in config:
-            self.set_show_all_detections(config['showAllDetections'])
-        if 'zoneColor' in config:
-            self.set_zone_color(config['zoneColor'])
-        if 'boxColor' in config:
-            self.set_box_color(config['boxColor'])
-        if 'zoneOpacity' in config:
-            self.set_zone_opacity(config['zoneOpacity'])
+        self.apply_settings({k: v for k, v in config.items() if k in (
+            'showBoxes', 'showLabels', 'showConfidence', 'showOverlays',
+            'showAllDetections', 'zoneColor', 'boxColor', 'zoneOpacity')})
 
     def apply_detection_config(self, config):
-        if 'threshold' in config:
-            self.set_detection_threshold(config['threshold'])
-        if 'autoCount' in config:
-            self.set_auto_count(config['autoCount'])
+        self.apply_settings({k: v for k, v in config.items() if k in ('threshold', 'autoCount')})
 
     def apply_advanced_config(self, config):
-        if 'resolution' in config:
-            self.set_resolution(config['resolution'])
-        if 'frameRate' in config:
-            self.set_frame_rate(config['frameRate'])
-        if 'processingSpeed' in config:
-            self.set_processing_speed(config['processingSpeed'])
-        if 'model' in config:
-            self.set_model(config['model'])
+        self.apply_settings({k: v for k, v in config.items() if k in (
+            'resolution', 'frameRate', 'processingSpeed', 'model')})
 
     def add_to_cart(self, product_name):
         product_lower = product_name.lower()
@@ -326,15 +517,56 @@ class ProductDetector:
                     "price": price,
                     "quantity": 1
                 }
+            self._cart_version = next(_cart_versions)
             return True
         return False
 
+    def remove_from_cart(self, product_lower):
+        details = self.cart.get(product_lower)
+        if details is None:
+            return False
+        if details["quantity"] > 1:
+            details["quantity"] -= 1
+        else:
+            del self.cart[product_lower]
+        self._cart_version = next(_cart_versions)
+        return True
+
     def get_cart(self):
         return self.cart
 
+    def set_product_catalog(self, catalog):
+        self.product_catalog = catalog
+        self._catalog_class_mask = None
+
+    def _get_zone_pixels(self):
+        # (zone x, zone width, detection zone start, detection zone end) in pixels,
+        # recomputed only when the zone percentages or the frame width change
+        key = (self.counting_zone_start_percent, self.counting_zone_width_percent, self.frame_width)
+        if key != self._zone_pixels_key:
+            start_pct, width_pct, frame_width = key
+            zone_x = int(frame_width * start_pct / 100)
+            self._zone_pixels = (zone_x, int(frame_width * width_pct / 100),
+                                 zone_x, int(frame_width * (start_pct + width_pct) / 100))
+            self._zone_pixels_key = key
+        return self._zone_pixels
+
+    def _get_catalog_class_mask(self, names):
+        # Catalog membership per model class id, rebuilt only when the catalog or the class names change
+        cached = self._catalog_class_mask
+        if cached is None or cached[0] is not names:
+            catalog = self.product_catalog
+            cached = self._catalog_class_mask = (
+                names, np.array([str(names[i]).lower() in catalog for i in range(len(names))], dtype=bool))
+        return cached[1]
+
+    def get_cart_version(self):
+        return self._cart_version
+
     def clear_cart(self):
         self.cart = {}
         self.counted_objects = {}
+        self._cart_version = next(_cart_versions)
 
     def calculate_total(self):
         total = 0
@@ -399,52 +631,59 @@ class ProductDetector:
             self.frame_count = 0
             self.last_fps_time = current_time
         
-        # Prepare overlay info
-        overlay_info = [
-            f"FPS: {self.fps_counter:.1f}",
-            f"Products: {len(detected_objects)}",
-            f"Model: {self.model_type}",
-            f"Threshold: {self.detection_threshold:.2f}",
-            f"Processing: {self.processing_time:.0f}ms"
-        ]
+        # Only the values change per frame; the "Name: " prefixes come from a cached sprite
+        values = (
+            f"{self.fps_counter:.1f}",
+            str(len(detected_objects)),
+            self.model_type,
+            f"{self.detection_threshold:.2f}",
+            f"{self.processing_time:.0f}ms",
+            f"All ({total_detections} total)" if self.show_all_detections else "Products Only",
+            "ACTIVE" if zone_status else "Clear",
+        )
+        chrome, chrome_mask, offsets, colors = self._get_overlay_chrome(zone_status)
         
-        # Show detection mode
-        if self.show_all_detections:
-            overlay_info.append(f"Mode: All ({total_detections} total)")
-        else:
-            overlay_info.append("Mode: Products Only")
-        
-        if zone_status:
-            overlay_info.append("Zone: ACTIVE")
-        else:
-            overlay_info.append("Zone: Clear")
-            
-        # Draw semi-transparent background
-        overlay_height = len(overlay_info) * 25 + 10
-        overlay_bg = np.zeros((overlay_height, 200, 3), dtype=np.uint8)
-        overlay_bg[:] = (0, 0, 0)  # Black background
-        
-        # Position in top-left corner
-        h, w = frame.shape[:2]
-        roi = frame[10:10+overlay_height, 10:210]
-        
-        # Apply overlay with transparency
-        alpha = 0.7
-        cv2.addWeighted(overlay_bg, alpha, roi, 1-alpha, 0, roi)
+        # Darken the top-left panel in place: same as blending a black box at alpha 0.7
+        roi = frame[10:10+chrome.shape[0], 10:210]
+        cv2.convertScaleAbs(roi, dst=roi, alpha=0.3)
+        h, w = roi.shape[:2]
+        mask = chrome_mask[:h, :w]
+        roi[mask] = chrome[:h, :w][mask]
         
         # Draw info text
-        for i, info in enumerate(overlay_info):
-            y_pos = 30 + i * 25
-            color = (0, 255, 0) if "FPS" in info else (255, 255, 255)  # Green for FPS, white for others
-            if "Zone: ACTIVE" in info:
-                color = (0, 255, 255)  # Yellow for active zone
-            cv2.putText(frame, info, (15, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-    def detect_objects(self, frame):
+        for i, (value, x_offset, color) in enumerate(zip(values, offsets, colors)):
+            cv2.putText(frame, value, (15 + x_offset, 30 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+    def _get_overlay_chrome(self, zone_status):
+        # Render the static prefixes once per zone state: sprite, its pixel mask, value x offsets, line colours
+        cache = self._overlay_chrome
+        chrome = cache.get(zone_status)
+        if chrome is None:
+            colors = [(255, 255, 255)] * len(self.OVERLAY_PREFIXES)
+            colors[0] = (0, 255, 0)  # Green for FPS
+            if zone_status:
+                colors[-1] = (0, 255, 255)  # Yellow for active zone
+            sprite = np.zeros((len(self.OVERLAY_PREFIXES) * 25 + 10, 200, 3), dtype=np.uint8)
+            offsets = []
+            for i, (prefix, color) in enumerate(zip(self.OVERLAY_PREFIXES, colors)):
+                cv2.putText(sprite, prefix, (5, 20 + i * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                offsets.append(cv2.getTextSize(prefix, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0][0])
+            chrome = cache[zone_status] = (sprite, sprite.any(axis=2), tuple(offsets), tuple(colors))
+        return chrome
+
+    def detect_objects(self, frame, draw=True):
+        # draw=False still detects and tracks but leaves the frame untouched
         start_time = time.time()
         
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb_frame)
+        model = self.model
+        if model is None:
+            # Weights released while a model change loads the next ones
+            return frame, []
+        
+        rgb_frame = self._rgb_buf
+        if rgb_frame is None or rgb_frame.shape != frame.shape:
+            rgb_frame = self._rgb_buf = np.empty_like(frame)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
 
         if self.processing_speed == 'fast':
             size = 320
@@ -453,52 +692,50 @@ class ProductDetector:
         else:
             size = 640
 
-        results = self.model(img, size=size)
+        with torch.inference_mode():
+            # AutoShape takes HWC RGB arrays as-is, no PIL wrapper or EXIF pass needed
+            results = model(rgb_frame, size=size)
 
         detected_objects = []
         zone_status = False  # Track if any object is in zone
         total_detections = 0  # Track total detections above threshold
 
-        # Extract detections more efficiently
-        if hasattr(results, 'pandas'):
-            detections_df = results.pandas().xyxy[0]
+        # Extract detections straight from the (N, 6) x1,y1,x2,y2,conf,cls tensor, no DataFrame
+        if hasattr(results, 'xyxy'):
+            dets = results.xyxy[0]
+            dets = dets[dets[:, 4] > self.detection_threshold].float().cpu().numpy()
+            total_detections = len(dets)  # Count all detections above threshold
+            names = results.names
             
-            for i, row in detections_df.iterrows():
-                label = row['name']
-                label_lower = label.lower()
-                confidence = row['confidence']
-                x1, y1, x2, y2 = int(row['xmin']), int(row['ymin']), int(row['xmax']), int(row['ymax'])
-
-                if confidence > self.detection_threshold:
-                    total_detections += 1  # Count all detections above threshold
-                    
-                    # Determine if we should show this detection
-                    is_catalog_product = label_lower in self.product_catalog
-                    should_show = self.show_all_detections or is_catalog_product
-
-                    # Only add to detected_objects if it's a catalog product (for cart functionality)
-                    if is_catalog_product:
-                        center_x = (x1 + x2) // 2
-                        # Check if object is in counting zone
-                        if self.frame_width > 0:
-                            zone_start = int(self.frame_width * self.counting_zone_start_percent / 100)
-                            zone_end = int(self.frame_width * (self.counting_zone_start_percent + self.counting_zone_width_percent) / 100)
-                            if zone_start <= center_x <= zone_end:
-                                zone_status = True
-                                
-                        detected_objects.append({
-                            'label': label_lower,
-                            'box': (x1, y1, x2, y2),
-                            'center': ((x1 + x2) // 2, (y1 + y2) // 2),
-                            'confidence': confidence
-                        })
+            # Only catalog products go into detected_objects (for cart functionality)
+            classes = dets[:, 5].astype(np.intp)
+            keep = self._get_catalog_class_mask(names)[classes]
+            classes = classes[keep]
+            boxes = dets[keep, :4].astype(np.int32)
+            confidences = dets[keep, 4]
+            centers_x = (boxes[:, 0] + boxes[:, 2]) // 2
+            centers_y = (boxes[:, 1] + boxes[:, 3]) // 2
+            
+            # Check if any product is in counting zone
+            if self.frame_width > 0:
+                zone_start, zone_end = self._get_zone_pixels()[2:]
+                zone_status = bool(((centers_x >= zone_start) & (centers_x <= zone_end)).any())
+            
+            for box, center_x, center_y, confidence, cls in zip(boxes.tolist(), centers_x.tolist(), centers_y.tolist(),
+                                                                 confidences.tolist(), classes.tolist()):
+                detected_objects.append({
+                    'label': names[cls].lower(),
+                    'box': tuple(box),
+                    'center': (center_x, center_y),
+                    'confidence': confidence
+                })
 
         # Apply tracking to catalog products only
         if detected_objects:
             detected_objects = self.tracker.update(detected_objects)
 
         # Draw detection boxes with tracking info
-        for obj in detected_objects:
+        for obj in (detected_objects if draw else ()):
             if self.show_all_detections or obj['label'] in self.product_catalog:
                 self._draw_detection_box(frame, *obj['box'], obj['label'], obj['confidence'], obj['label'], obj.get('track_id'))
 
@@ -506,7 +743,8 @@ class ProductDetector:
         self.processing_time = (time.time() - start_time) * 1000
         
         # Draw info overlay
-        self._draw_info_overlay(frame, detected_objects, zone_status, total_detections)
+        if draw:
+            self._draw_info_overlay(frame, detected_objects, zone_status, total_detections)
 
         return frame, detected_objects
 
@@ -548,6 +786,8 @@ class ProductDetector:
 
         active_objects = {}
         last_seen = {}
+        zone_text = "COUNTING ZONE"
+        text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
 
         frame_time = 1.0 / self.target_fps if self.target_fps > 0 else 0.033
 
@@ -563,8 +803,7 @@ class ProductDetector:
                 self.counting_zone_start_percent = cv2.getTrackbarPos("Zone Start %", "Controls")
                 self.counting_zone_width_percent = cv2.getTrackbarPos("Zone Width %", "Controls")
 
-                counting_zone_x = int(self.frame_width * self.counting_zone_start_percent / 100)
-                counting_zone_width = int(self.frame_width * self.counting_zone_width_percent / 100)
+                counting_zone_x, counting_zone_width = self._get_zone_pixels()[:2]
 
                 processed_frame, detected_objects = self.detect_objects(frame)
 
@@ -599,17 +838,14 @@ class ProductDetector:
                 zone_end_right = (counting_zone_x + counting_zone_width, 0)
                 zone_start_right = (counting_zone_x + counting_zone_width, self.frame_height)
 
-                overlay = processed_frame.copy()
-                cv2.rectangle(overlay, (counting_zone_x, 0),
-                              (counting_zone_x + counting_zone_width, self.frame_height),
-                              self.zone_color, -1)
-                cv2.addWeighted(overlay, self.zone_opacity, processed_frame, 1 - self.zone_opacity, 0, processed_frame)
+                # Blend just the zone band in place; the colour/opacity matrix is built by the setters
+                zone_roi = processed_frame[:, counting_zone_x:counting_zone_x + counting_zone_width]
+                if zone_roi.size:
+                    cv2.transform(zone_roi, self._zone_blend, dst=zone_roi)
 
                 cv2.line(processed_frame, zone_start, zone_end, self.zone_color, 2)
                 cv2.line(processed_frame, zone_end_right, zone_start_right, self.zone_color, 2)
 
-                zone_text = "COUNTING ZONE"
-                text_size = cv2.getTextSize(zone_text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
                 text_x = counting_zone_x + (counting_zone_width - text_size[0]) // 2
                 text_y = 30
 
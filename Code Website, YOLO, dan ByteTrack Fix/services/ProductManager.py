@@ -2,6 +2,8 @@ class ProductManager:
     def __init__(self, firestore_manager):
         self.firestore_manager = firestore_manager
         self.products = {}
+        # Bumped on every change so callers can skip re-reading unchanged products
+        self._version = 0
         self.load_products()
 
     def load_products(self):
@@ -9,11 +11,15 @@ class ProductManager:
             self.products = self.firestore_manager.get_products()
         else:
             self.products = {}
+        self._version += 1
 
 
     def get_products(self):
         return self.products
 
+    def get_version(self):
+        return self._version
+
     def add_product(self, name, price):
         name_lower = name.lower()
 
@@ -23,6 +29,7 @@ class ProductManager:
         result = self.firestore_manager.add_product(name_lower, price)
         if result:
             self.products[name_lower] = price
+            self._version += 1
             return {"name": name_lower, "price": price}
         return None
 
@@ -37,6 +44,7 @@ class ProductManager:
         result = self.firestore_manager.update_product(name_lower, price)
         if result:
             self.products[name_lower] = price
+            self._version += 1
             return {"name": name_lower, "price": price}
         return None
 
@@ -51,6 +59,7 @@ class ProductManager:
         result = self.firestore_manager.delete_product(name_lower)
         if result:
             del self.products[name_lower]
+            self._version += 1
             return {"name": name_lower}
         return None
 
@@ -61,5 +70,6 @@ class ProductManager:
         result = self.firestore_manager.delete_all_products()
         deleted_count = len(self.products)
         self.products = {}
+        self._version += 1
         
         return {"deleted_count": deleted_count}
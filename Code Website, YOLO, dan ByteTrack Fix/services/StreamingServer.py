@@ -5,66 +5,101 @@ import numpy as np
 from flask import Response
 import io
 
+try:
+    from turbojpeg import TurboJPEG
+    _turbo_jpeg = TurboJPEG()
+except Exception:  # PyTurboJPEG or the native libturbojpeg is missing, use OpenCV
+    _turbo_jpeg = None
+
+
+def encode_jpeg(frame, quality):
+    """Encode a BGR frame as JPEG bytes, None on failure"""
+    if _turbo_jpeg is not None:
+        return _turbo_jpeg.encode(frame, quality=quality)
+    success, encoded_image = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return encoded_image.tobytes() if success else None
+
 
 class StreamingServer:
     def __init__(self):
         self.frame = None
         self.frame_lock = threading.Lock()
+        # Notified on every new frame, so stream generators wait instead of polling
+        self.frame_cond = threading.Condition(self.frame_lock)
         self.output_frame = None
         self.frame_count = 0
         self.is_running = False
+        # quality -> (frame_count, JPEG bytes): each frame is encoded once, however many clients stream it
+        self._jpeg_cache = {}
+        self._encode_lock = threading.Lock()
         
     def update_frame(self, frame):
-        """Update the current frame thread-safely"""
+        """Update the current frame thread-safely
+        
+        The frame is taken by reference: callers must not modify it after handing it over
+        """
         if frame is not None:
             with self.frame_lock:
-                self.frame = frame.copy()
+                self.frame = frame
                 self.frame_count += 1
+                self.frame_cond.notify_all()
     
     def get_frame(self):
-        """Get current frame thread-safely"""
+        """Get current frame thread-safely (shared reference, read-only)"""
         with self.frame_lock:
-            if self.frame is not None:
-                return self.frame.copy()
-            return None
+            return self.frame
+    
+    def get_jpeg(self, quality):
+        """Get (frame number, JPEG bytes) of the current frame, encoding it at most once per quality"""
+        with self._encode_lock:
+            with self.frame_lock:
+                # Published frames are never modified, so the reference is safe to encode
+                frame, frame_count = self.frame, self.frame_count
+            if frame is None:
+                return frame_count, None
+            
+            cached = self._jpeg_cache.get(quality)
+            if cached is not None and cached[0] == frame_count:
+                return cached
+            
+            encoded = encode_jpeg(frame, quality)
+            if encoded is not None:
+                self._jpeg_cache[quality] = (frame_count, encoded)
+            return frame_count, encoded
+    
+    def wait_for_new_frame(self, last_frame_count, timeout=1.0):
+        """Block until a frame newer than last_frame_count arrives (or stop/timeout)"""
+        with self.frame_cond:
+            return self.frame_cond.wait_for(
+                lambda: self.frame_count != last_frame_count or not self.is_running, timeout)
     
     # No placeholder frames - direct frame handling only
     
     def generate_mjpeg_stream(self):
         """Generate MJPEG stream for video element"""
         self.is_running = True
-        frame_count = 0
-        
-        pass
+        last_sent = None
         
         while self.is_running:
             try:
-                frame_count += 1
-                
-                # Get current frame
-                frame = self.get_frame()
+                # Get current frame as JPEG with high quality (shared with other clients)
+                frame_count, encoded_image = self.get_jpeg(90)
                 
-                if frame is None:
+                if encoded_image is None:
                     time.sleep(0.1)
                     continue
                 
-                # Encode frame as JPEG with high quality
-                encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 90]
-                success, encoded_image = cv2.imencode('.jpg', frame, encode_param)
-                
-                if not success:
-                    print(f"❌ Frame encoding failed at frame {frame_count}")
+                # Nothing new since the last frame sent to this client
+                if frame_count == last_sent:
+                    self.wait_for_new_frame(last_sent)
                     continue
-                
-                # Log every 100 frames
-                if frame_count % 100 == 0:
-                    pass
+                last_sent = frame_count
                 
                 # Create MJPEG frame
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n'
-                       b'Content-Length: ' + str(len(encoded_image)) + b'\r\n'
-                       b'\r\n' + encoded_image.tobytes() + b'\r\n')
+                       b'Content-Length: ' + str(len(encoded_image)).encode() + b'\r\n'
+                       b'\r\n' + encoded_image + b'\r\n')
                 
                 # Control frame rate - 25 FPS
                 time.sleep(0.04)
@@ -81,19 +116,8 @@ class StreamingServer:
     def generate_single_frame(self):
         """Generate single frame"""
         try:
-            frame = self.get_frame()
-            
-            if frame is None:
-                return None
-            
             # Encode as JPEG
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 85]
-            success, encoded_image = cv2.imencode('.jpg', frame, encode_param)
-            
-            if success:
-                return encoded_image.tobytes()
-            else:
-                return None
+            return self.get_jpeg(85)[1]
                 
         except Exception as e:
             print(f"Single frame generation error: {e}")
@@ -101,4 +125,6 @@ class StreamingServer:
     
     def stop(self):
         """Stop the streaming server"""
-        self.is_running = False
\ No newline at end of file
+        with self.frame_cond:
+            self.is_running = False
+            self.frame_cond.notify_all()
\ No newline at end of file
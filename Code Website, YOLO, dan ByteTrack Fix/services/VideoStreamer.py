@@ -1,7 +1,7 @@
-import cv2
 import threading
 import time
 import numpy as np
+from StreamingServer import encode_jpeg
 
 
 class VideoStreamer:
@@ -12,45 +12,57 @@ class VideoStreamer:
         self.frame_ready = threading.Event()
         self.frame = None
         self.frame_ready.set()
+        # Published frame number; generators wait on frame_cond for the next one
+        self.frame_seq = 0
+        self.frame_cond = threading.Condition(self.lock)
+        # (frame_seq, JPEG bytes) of the newest frame, encoded once and shared by every client
+        self._jpeg = (0, None)
+        self._encode_lock = threading.Lock()
         
     def update_frame(self, frame):
+        # The frame is handed over, not copied: callers must not modify it after publishing
         if frame is not None:
-            with self.lock:
-                self.frame = frame.copy()
+            with self.frame_cond:
+                self.frame = frame
+                self.frame_seq += 1
                 self.frame_ready.set()
+                self.frame_cond.notify_all()
     
     def get_latest_frame(self):
+        # Shared, read-only reference to the newest frame
         with self.lock:
-            if self.frame is not None:
-                return self.frame.copy()
-            else:
-                return None
+            return self.frame
+    
+    def _next_jpeg(self, last_seq, timeout=1.0):
+        # Wait for a frame newer than last_seq, return (frame_seq, JPEG bytes or None)
+        with self.frame_cond:
+            self.frame_cond.wait_for(lambda: self.frame_seq != last_seq or not self.is_active, timeout)
+        with self._encode_lock:
+            with self.lock:
+                frame, seq = self.frame, self.frame_seq
+            if frame is None:
+                return seq, None
+            if self._jpeg[0] != seq:
+                # Encode with good quality
+                self._jpeg = (seq, encode_jpeg(frame, 85))
+            return self._jpeg
     
     
     def generate_frames(self):
         self.is_active = True
-        frame_count = 0
+        last_seq = None
         
         while self.is_active:
             try:
-                frame = self.get_latest_frame()
+                seq, frame_bytes = self._next_jpeg(last_seq)
                 
-                if frame is None:
+                if frame_bytes is None:
                     time.sleep(0.1)
                     continue
                 
-                # Add frame counter
-                frame_count += 1
-                
-                # Encode with good quality
-                encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 85]
-                success, buffer = cv2.imencode('.jpg', frame, encode_param)
-                
-                if not success:
-                    print("Frame encoding failed")
-                    continue  # Skip this frame, web will handle blank screen
-                
-                frame_bytes = buffer.tobytes()
+                if seq == last_seq:
+                    continue  # Timed out waiting, nothing new to send
+                last_seq = seq
                 
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n'
@@ -65,7 +77,9 @@ class VideoStreamer:
                 time.sleep(0.1)
     
     def stop(self):
-        self.is_active = False
+        with self.frame_cond:
+            self.is_active = False
+            self.frame_cond.notify_all()
         self.frame_ready.set()
     
     def wait_for_frame(self, timeout=5.0):
@@ -18,7 +18,7 @@ from ProductManager import ProductManager
 from FirestoreManager import FirestoreManager
 from VideoStreamer import VideoStreamer
 from StreamingServer import StreamingServer
-from PaymentManager import PaymentManager
+from PaymentManager import get_payment_manager
 
 
 def format_transaction_for_json(transaction):
@@ -84,7 +84,7 @@ class SelfCheckoutApp:
         
         # Initialize PaymentManager
         try:
-            self.payment_manager = PaymentManager()
+            self.payment_manager = get_payment_manager()
             print(f"✅ PaymentManager initialized for {self.payment_manager.environment} environment")
         except Exception as e:
             print(f"❌ Failed to initialize PaymentManager: {str(e)}")
@@ -130,9 +130,17 @@ class SelfCheckoutApp:
 
         @self.app.route('/video_feed')
         def video_feed():
+            def watched_frames():
+                # Count the MJPEG client as a viewer for as long as the response streams
+                self.detector_manager.viewer_attached()
+                try:
+                    yield from self.video_streamer.generate_frames()
+                finally:
+                    self.detector_manager.viewer_detached()
+
             try:
                 return Response(
-                    self.video_streamer.generate_frames(),
+                    watched_frames(),
                     mimetype='multipart/x-mixed-replace; boundary=frame',
                     headers={
                         'Cache-Control': 'no-cache, no-store, must-revalidate',
@@ -153,9 +161,17 @@ class SelfCheckoutApp:
         @self.app.route('/video_stream')
         def video_stream():
             """Proper MJPEG video stream for video element"""
+            def watched_frames():
+                # Same viewer accounting as /video_feed, this stream serves the same frames
+                self.detector_manager.viewer_attached()
+                try:
+                    yield from self.streaming_server.generate_mjpeg_stream()
+                finally:
+                    self.detector_manager.viewer_detached()
+
             try:
                 return Response(
-                    self.streaming_server.generate_mjpeg_stream(),
+                    watched_frames(),
                     mimetype='multipart/x-mixed-replace; boundary=frame',
                     headers={
                         'Cache-Control': 'no-cache, no-store, must-revalidate, max-age=0',
@@ -513,6 +529,8 @@ class SelfCheckoutApp:
         def current_frame():
             """Single frame response"""
             try:
+                # Keep frames annotated while a client keeps polling this route
+                self.detector_manager.viewer_polled()
                 frame_data = self.streaming_server.generate_single_frame()
                 if frame_data is None:
                     return Response("Frame generation failed", status=500)
@@ -656,6 +674,7 @@ class SelfCheckoutApp:
         @self.socketio.on('connect')
         def handle_connect():
             print('Client connected')
+            self.detector_manager.viewer_attached()
             # Send current states to client
             camera_info = self.detector_manager.get_current_camera_info()
             self.socketio.emit('camera_status', {
@@ -679,6 +698,7 @@ class SelfCheckoutApp:
         @self.socketio.on('disconnect')
         def handle_disconnect():
             print('Client disconnected')
+            self.detector_manager.viewer_detached()
 
         @self.socketio.on('start_scanning')
         def handle_start_scanning(data):
@@ -1071,9 +1091,8 @@ class SelfCheckoutApp:
         def handle_update_detection_config(data):
             success = self.detector_manager.apply_detection_config(data)
             if success:
-                # Save updated config to Firebase and local file
-                self.detector_manager.save_config()
-                pass
+                # Save updated config to Firebase (debounced, the result arrives as config_saved)
+                self.detector_manager.save_config_debounced(self._emit_config_saved)
             
             self.socketio.emit('config_updated', {
                 'success': success,
@@ -1085,9 +1104,8 @@ class SelfCheckoutApp:
         def handle_update_visual_config(data):
             success = self.detector_manager.apply_visual_config(data)
             if success:
-                # Save updated config to Firebase and local file
-                self.detector_manager.save_config()
-                pass
+                # Save updated config to Firebase (debounced, the result arrives as config_saved)
+                self.detector_manager.save_config_debounced(self._emit_config_saved)
             
             self.socketio.emit('config_updated', {
                 'success': success,
@@ -1099,9 +1117,8 @@ class SelfCheckoutApp:
         def handle_update_advanced_config(data):
             success = self.detector_manager.apply_advanced_config(data)
             if success:
-                # Save updated config to Firebase and local file
-                self.detector_manager.save_config()
-                pass
+                # Save updated config to Firebase (debounced, the result arrives as config_saved)
+                self.detector_manager.save_config_debounced(self._emit_config_saved)
             
             self.socketio.emit('config_updated', {
                 'success': success,
@@ -1114,9 +1131,8 @@ class SelfCheckoutApp:
             preset = data
             success = self.detector_manager.apply_preset_config(preset)
             if success:
-                # Save updated config to Firebase and local file
-                self.detector_manager.save_config()
-                pass
+                # Save updated config to Firebase (debounced, the result arrives as config_saved)
+                self.detector_manager.save_config_debounced(self._emit_config_saved)
             
             self.socketio.emit('config_applied', {
                 'success': success,
@@ -1127,9 +1143,8 @@ class SelfCheckoutApp:
         def handle_apply_full_config(data):
             success = self.detector_manager.apply_full_config(data)
             if success:
-                # Save updated config to Firebase and local file
-                self.detector_manager.save_config()
-                pass
+                # Save updated config to Firebase (debounced, the result arrives as config_saved)
+                self.detector_manager.save_config_debounced(self._emit_config_saved)
             
             self.socketio.emit('config_applied', {
                 'success': success,
@@ -1536,6 +1551,9 @@ class SelfCheckoutApp:
         frame_count = 0
         last_process_time = time.time()
         skip_frames = 0
+        # Cart version last sent via cart_update, and when; see the emit below
+        emitted_cart_version = None
+        last_cart_emit = 0.0
         
         while self.is_processing:
             try:
@@ -1560,6 +1578,7 @@ class SelfCheckoutApp:
                         skip_frames += 1
                         if skip_frames >= 2:  # Skip every 2nd frame when too fast
                             skip_frames = 0
+                            self.detector_manager.camera_manager.release_frame(frame)
                             continue
                     else:
                         skip_frames = 0  # Reset skip counter if processing is slow
@@ -1567,17 +1586,31 @@ class SelfCheckoutApp:
                     # Get frame dimensions from the frame itself
                     frame_height, frame_width = frame.shape[:2]
                     processed_frame = self.detector_manager.process_frame(frame, frame_width, frame_height)
-                    self.video_streamer.update_frame(processed_frame)
-                    self.streaming_server.update_frame(processed_frame)  # Feed to streaming server
+                    if processed_frame is not None:
+                        # The camera buffer behind processed_frame is recycled, so publish one
+                        # copy and share it between both streamers (neither modifies it)
+                        published_frame = processed_frame.copy()
+                        self.video_streamer.update_frame(published_frame)
+                        self.streaming_server.update_frame(published_frame)  # Feed to streaming server
                     
                     last_process_time = current_time
                     
-                    # Only emit cart updates during scanning to reduce socket overhead
-                    if self.detector_manager.is_scanning and frame_count % 3 == 0:  # Reduce cart update frequency
-                        self.socketio.emit('cart_update', {
-                            'cart': self.detector_manager.get_cart(),
-                            'total': self.detector_manager.calculate_total()
-                        })
+                    # Only emit cart updates during scanning, and only when the cart changed;
+                    # a burst of additions within 100ms goes out as one update
+                    if (self.detector_manager.is_scanning
+                            and current_time - last_cart_emit >= 0.1):
+                        cart_version = self.detector_manager.get_cart_version()
+                        if cart_version != emitted_cart_version:
+                            self.socketio.emit('cart_update', {
+                                'cart': self.detector_manager.get_cart(),
+                                'total': self.detector_manager.calculate_total()
+                            })
+                            emitted_cart_version = cart_version
+                            last_cart_emit = current_time
+                elif self.detector_manager.camera_manager.is_reading():
+                    # Camera is fine, the reader just has not decoded the next frame yet
+                    # (expected with a lowered frameRate, which skips decodes)
+                    pass
                 else:
                     # Camera read failed - reduce error checking frequency
                     if frame_count % 500 == 0:  # Check errors less frequently
@@ -1597,6 +1630,10 @@ class SelfCheckoutApp:
                 if processed_frame is not None:
                     self._emit_frame_via_socket(processed_frame)
                 
+                # Streamers keep their own copies, so the camera buffer can be reused
+                if success and frame is not None:
+                    self.detector_manager.camera_manager.release_frame(frame)
+                
                 time.sleep(0.033)  # 30 FPS for real-time feel
                 
             except Exception as e:
@@ -1938,6 +1975,12 @@ class SelfCheckoutApp:
         self.processing_thread.start()
         print("Video processing started")
 
+    def _emit_config_saved(self, success):
+        # Result of a debounced config save, reported the same way as the save_config event
+        self.socketio.emit('config_saved', {
+            'success': success
+        })
+
     def stop_processing(self):
         print("🔧 Stopping processing completely...")
         self.is_processing = False
@@ -2013,6 +2056,8 @@ class SelfCheckoutApp:
             )
         finally:
             self.stop_processing()
+            # Write a config edit still waiting in the debounce window before exiting
+            self.detector_manager.flush_config()
 
 
 if __name__ == '__main__':
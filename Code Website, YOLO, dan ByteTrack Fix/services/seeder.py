@@ -87,8 +87,10 @@ def generate_random_transactions(firestore_manager, num_transactions=20):
         
         # Save transaction with custom timestamp
         try:
-            # Create transaction documents
+            # Create transaction documents, one batch commit per cart
             transaction_ids = []
+            group_id = str(uuid.uuid4())
+            batch = firestore_manager.db.batch()
             for product_name, details in cart.items():
                 transaction_id = str(uuid.uuid4())
                 transaction_ref = firestore_manager.db.collection('transactions').document(transaction_id)
@@ -99,12 +101,15 @@ def generate_random_transactions(firestore_manager, num_transactions=20):
                     'quantity': details['quantity'],
                     'subtotal': details['price'] * details['quantity'],
                     'total': total,
+                    'group_id': group_id,
                     'timestamp': transaction_date
                 }
                 
-                transaction_ref.set(transaction_data)
+                batch.set(transaction_ref, transaction_data)
                 transaction_ids.append(transaction_id)
             
+            batch.commit()
+            
             print(f"✓ Transaction {i+1}: {len(cart)} items, Total: Rp {total:,}")
             success_count += 1
             